@@ -1,16 +1,49 @@
 from .candle import Candle
 from .trade import Trade
+from .ticker import BookTicker, MarkPrice
+from .symbol import SymbolInfo
 from .order import Order, OrderUpdate
-from .stream import Stream, CandleStream, TradeStream, OrderUpdateStream, MixedStream
+from .account import Balance, Position, Account
+from .frame import CandleFrame, TradeFrame
+from .book import OrderBook
+from .stream import Stream, CandleStream, TradeStream, OrderBookStream, BookTickerStream, MarkPriceStream
+from .stream import OrderUpdateStream, AccountStream, MixedStream
+from .aggregator import CandleAggregator
+from .cache import HistoryCache
+from .window import CandleWindow, TradeWindow
+from .indicator import SMA, EMA, RSI, ATR, BollingerBands, VWAP
 
 __all__ = (
     Candle,
     Trade,
+    BookTicker,
+    MarkPrice,
+    SymbolInfo,
     Order,
     OrderUpdate,
+    Balance,
+    Position,
+    Account,
+    CandleFrame,
+    TradeFrame,
+    OrderBook,
     Stream,
     CandleStream,
     TradeStream,
+    OrderBookStream,
+    BookTickerStream,
+    MarkPriceStream,
     OrderUpdateStream,
+    AccountStream,
     MixedStream,
+    CandleAggregator,
+    HistoryCache,
+    CandleWindow,
+    TradeWindow,
+    SMA,
+    EMA,
+    RSI,
+    ATR,
+    BollingerBands,
+    VWAP,
 )
@@ -0,0 +1,114 @@
+from .order import OrderUpdate
+
+class Balance:
+
+    __slots__ = ('asset', 'time', 'wallet_balance', 'cross_balance')
+
+    def __init__(self, asset, time, wallet_balance, cross_balance):
+        self.asset = asset
+        self.time = time
+        self.wallet_balance = wallet_balance
+        self.cross_balance = cross_balance
+
+    def astuple(self):
+        return (self.asset, self.time, self.wallet_balance, self.cross_balance)
+
+    def __eq__(self, other):
+        if not isinstance(other, Balance):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __hash__(self):
+        return hash((self.asset, self.time))
+
+    def __str__(self):
+        return f'balance asset:{self.asset}, time:{self.time}, wallet:{self.wallet_balance}, cross:{self.cross_balance}'
+
+    def __repr__(self):
+        return self.__str__()
+
+class Position:
+
+    __slots__ = ('symbol', 'side', 'time', 'size', 'entry_price', 'unrealized_pnl')
+
+    def __init__(self, symbol, side, time, size, entry_price, unrealized_pnl):
+        self.symbol = symbol
+        self.side = side # both in one-way mode, long or short in hedge mode
+        self.time = time
+        self.size = size # negative when short
+        self.entry_price = entry_price
+        self.unrealized_pnl = unrealized_pnl
+
+    def astuple(self):
+        return (self.symbol, self.side, self.time, self.size, self.entry_price, self.unrealized_pnl)
+
+    def __eq__(self, other):
+        if not isinstance(other, Position):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __hash__(self):
+        return hash((self.symbol, self.side, self.time))
+
+    def __str__(self):
+        return f'position symbol:{self.symbol}, side:{self.side}, time:{self.time}, size:{self.size}, entry:{self.entry_price}, pnl:{self.unrealized_pnl}'
+
+    def __repr__(self):
+        return self.__str__()
+
+class Account: # balances, positions and open orders, kept current by the user stream
+
+    def __init__(self):
+        self.balances = {} # asset -> Balance
+        self.positions = {} # (symbol, side) -> Position, flat positions are removed
+        self.open_orders = {} # order id -> latest OrderUpdate
+        self.loaded = False # seeded from a snapshot
+
+    def balance(self, asset):
+        return self.balances.get(asset)
+
+    def position(self, symbol, side='both'):
+        return self.positions.get((symbol, side))
+
+    def store(self, item):
+        if isinstance(item, Balance):
+            return self.balances, item.asset
+        if isinstance(item, Position):
+            return self.positions, (item.symbol, item.side)
+        if isinstance(item, OrderUpdate):
+            return self.open_orders, item.order.id
+        raise Exception(f'invalid account item {item}')
+
+    def update(self, item):
+        # returns whether the state changed; an item older than what is stored is ignored
+        store, key = self.store(item)
+        last = store.get(key)
+        if last is not None and item.time < last.time:
+            return False
+        if isinstance(item, Position) and item.size == 0 or isinstance(item, OrderUpdate) and item.status in ['fill', 'cancel', 'expire']:
+            return store.pop(key, None) is not None
+        store[key] = item
+        return True
+
+    def load(self, items, time):
+        # replace the state with a snapshot taken at time, keeping whatever changed after it;
+        # returns the items that changed
+        keys = set()
+        changed = []
+        for item in items:
+            store, key = self.store(item)
+            keys.add((id(store), key))
+            if self.update(item):
+                changed.append(item)
+        for store in (self.balances, self.positions, self.open_orders):
+            for key, item in list(store.items()):
+                if (id(store), key) not in keys and item.time < time:
+                    del store[key] # closed while nobody was listening
+        self.loaded = True
+        return changed
+
+    def __str__(self):
+        return f'account balances:{len(self.balances)}, positions:{len(self.positions)}, open orders:{len(self.open_orders)}'
+
+    def __repr__(self):
+        return self.__str__()
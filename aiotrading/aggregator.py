@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from datetime import timedelta
+from decimal import Decimal
+from .candle import Candle
+from .trade import Trade
+from .frame import CandleFrame, np
+from .stream import CandleStream
+from .timeframe import timeframe_floor, timeframe_next, timeframe_floor_ms, timeframe_next_ms
+
+log = logging.getLogger('aiotrading')
+
+class CandleBuilder: # builds candles of one timeframe from smaller candles or trades
+
+    def __init__(self, symbol, timeframe):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.open_time = None
+        self.close_time = None
+        self.done = None # merged base candles that are closed
+        self.last = None # last candle emitted
+
+    def start(self, t):
+        out = []
+        if self.last is not None and not self.last.closed:
+            c = self.last # bucket is over, even if its final base candle never arrived
+            out.append(Candle(symbol=c.symbol, timeframe=c.timeframe, open_time=c.open_time, update_time=c.update_time,
+                open=c.open, high=c.high, low=c.low, close=c.close, volume=c.volume, buy_volume=c.buy_volume,
+                trades=c.trades, closed=True))
+        self.open_time = timeframe_floor(t, self.timeframe)
+        self.close_time = timeframe_next(t, self.timeframe)
+        self.done = None
+        self.last = None
+        return out
+
+    def merge(self, a, open, high, low, close, volume, buy_volume, trades):
+        if a is None:
+            return Candle(symbol=self.symbol, timeframe=self.timeframe, open_time=self.open_time,
+                update_time=self.close_time-timedelta(milliseconds=1), open=open, high=high, low=low,
+                close=close, volume=volume, buy_volume=buy_volume, trades=trades, closed=False)
+        return Candle(symbol=self.symbol, timeframe=self.timeframe, open_time=self.open_time,
+            update_time=a.update_time, open=a.open, high=max(a.high, high), low=min(a.low, low),
+            close=close, volume=a.volume+volume, buy_volume=a.buy_volume+buy_volume,
+            trades=a.trades+trades, closed=False)
+
+    def add_candle(self, c):
+        out = []
+        if self.open_time is None or not self.open_time <= c.open_time < self.close_time:
+            out += self.start(c.open_time)
+        # a provisional base candle is replaced by its next update, so only closed ones are kept in done
+        candle = self.merge(self.done, c.open, c.high, c.low, c.close, c.volume, c.buy_volume, c.trades)
+        if c.closed:
+            self.done = candle
+            candle.closed = timeframe_next(c.open_time, c.timeframe) >= self.close_time
+        self.last = candle
+        out.append(candle)
+        return out
+
+    def add_trade(self, t):
+        out = []
+        if self.open_time is None or not self.open_time <= t.time < self.close_time:
+            out += self.start(t.time)
+        # trade.buy carries binance's buyer-is-maker flag, so the taker bought when it is false
+        buy_volume = Decimal(0) if t.buy else t.volume
+        self.done = self.merge(self.done, t.price, t.price, t.price, t.price, t.volume, buy_volume, 1)
+        self.last = self.done
+        out.append(self.done)
+        return out
+
+class CandleAggregator:
+
+    def __init__(self, source, timeframes, maxsize=0, policy='block'):
+        self.source = source # a CandleStream of a smaller timeframe or a TradeStream
+        self.symbol = source.symbol
+        self.builders = {tf: CandleBuilder(self.symbol, tf) for tf in timeframes}
+        self.streams = {tf: CandleStream(source.exchange, self.symbol, tf, maxsize, policy) for tf in timeframes}
+        self.blocked = [] # (stream, candle) that found a full blocking queue, written by the worker once there is room
+        self.task = None
+
+    def update(self, item):
+        out = []
+        for builder in self.builders.values():
+            if isinstance(item, Trade):
+                candles = builder.add_trade(item)
+            else:
+                candles = builder.add_candle(item)
+            stream = self.streams[builder.timeframe]
+            for c in candles:
+                if not stream.write_nowait(c):
+                    self.blocked.append((stream, c))
+            out += candles
+        return out
+
+    async def worker(self):
+        while True:
+            self.update(await self.source.read())
+            blocked, self.blocked = self.blocked, []
+            for stream, c in blocked:
+                await stream.write_wait(c)
+
+    async def open(self):
+        log.info(f'opening {self}')
+        await self.source.open()
+        self.task = asyncio.get_event_loop().create_task(self.worker())
+
+    async def close(self):
+        log.info(f'closing {self}')
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        await self.source.close()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def __str__(self):
+        return f'candle aggregator {self.source} -> {", ".join(self.builders)}'
+
+    def __repr__(self):
+        return self.__str__()
+
+def aggregate_candles(candles, timeframe):
+    # roll up history (a list of candles or a CandleFrame) into a larger timeframe
+    if isinstance(candles, CandleFrame):
+        return aggregate_frame(candles, timeframe)
+    if len(candles) == 0:
+        return []
+    builder = CandleBuilder(candles[0].symbol, timeframe)
+    out = {}
+    for c in candles:
+        for candle in builder.add_candle(c):
+            out[candle.open_time] = candle
+    return list(out.values())
+
+def aggregate_frame(frame, timeframe):
+    if len(frame) == 0:
+        return CandleFrame(frame.symbol, timeframe)
+    open_time = frame.open_time
+    if timeframe.endswith('M'):
+        buckets = np.array([timeframe_floor_ms(int(t), timeframe) for t in open_time], dtype='int64')
+    else:
+        buckets = timeframe_floor_ms(open_time, timeframe)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets))+1))
+    ends = np.concatenate((starts[1:], [len(frame)]))-1
+    close_time = np.array([timeframe_next_ms(int(t), timeframe) for t in buckets[starts]], dtype='int64')
+    return CandleFrame(frame.symbol, timeframe,
+        open_time=buckets[starts],
+        update_time=close_time-1,
+        open=frame.open[starts],
+        high=np.maximum.reduceat(frame.high, starts),
+        low=np.minimum.reduceat(frame.low, starts),
+        close=frame.close[ends],
+        volume=np.add.reduceat(frame.volume, starts),
+        buy_volume=np.add.reduceat(frame.buy_volume, starts),
+        trades=np.add.reduceat(frame.trades, starts),
+        closed=frame.closed[ends] & (frame.update_time[ends]+1 >= close_time),
+    )
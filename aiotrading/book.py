@@ -0,0 +1,112 @@
+from bisect import bisect_left
+
+# local order book. prices and sizes are floats, as in frames. each side keeps
+# its levels in sorted lists with the best price last, so the updates that
+# matter (near the top) insert and delete at the cheap end of the list.
+
+class BookSide:
+
+    def __init__(self, sign):
+        self.sign = sign # 1 for bids, -1 for asks: keys ascend towards the best price
+        self.keys = []
+        self.sizes = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self): # best level first
+        sign, keys, sizes = self.sign, self.keys, self.sizes
+        for i in range(len(keys)-1, -1, -1):
+            yield sign*keys[i], sizes[i]
+
+    def load(self, levels):
+        levels = sorted((self.sign*float(p), float(q)) for p, q in levels)
+        self.keys = [k for k, q in levels if q != 0]
+        self.sizes = [q for k, q in levels if q != 0]
+
+    def set(self, price, size): # a zero size removes the level
+        k = self.sign*price
+        keys = self.keys
+        i = bisect_left(keys, k)
+        if i < len(keys) and keys[i] == k:
+            if size == 0:
+                del keys[i]
+                del self.sizes[i]
+            else:
+                self.sizes[i] = size
+        elif size != 0:
+            keys.insert(i, k)
+            self.sizes.insert(i, size)
+
+    @property
+    def best(self):
+        if len(self.keys) == 0:
+            return None
+        return self.sign*self.keys[-1], self.sizes[-1]
+
+    def size_at(self, price):
+        k = self.sign*float(price)
+        i = bisect_left(self.keys, k)
+        if i < len(self.keys) and self.keys[i] == k:
+            return self.sizes[i]
+        return 0.0
+
+    def depth_to(self, price): # total size of the levels at price or better
+        return sum(self.sizes[bisect_left(self.keys, self.sign*float(price)):])
+
+    def top(self, n):
+        keys, sizes = self.keys[-n:], self.sizes[-n:]
+        return [(self.sign*keys[i], sizes[i]) for i in range(len(keys)-1, -1, -1)]
+
+class OrderBook:
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bids = BookSide(1)
+        self.asks = BookSide(-1)
+        self.update_id = None # exchange sequence number of the last change applied
+        self.time = None
+        self.synced = False # false while the book is being (re)loaded
+
+    def load(self, bids, asks, update_id):
+        self.bids.load(bids)
+        self.asks.load(asks)
+        self.update_id = update_id
+
+    def apply(self, bids, asks): # levels as (price, size) pairs, strings or numbers
+        for p, q in bids:
+            self.bids.set(float(p), float(q))
+        for p, q in asks:
+            self.asks.set(float(p), float(q))
+
+    @property
+    def best_bid(self):
+        return self.bids.best
+
+    @property
+    def best_ask(self):
+        return self.asks.best
+
+    @property
+    def spread(self):
+        if len(self.bids) == 0 or len(self.asks) == 0:
+            return None
+        return self.asks.best[0]-self.bids.best[0]
+
+    @property
+    def mid(self):
+        if len(self.bids) == 0 or len(self.asks) == 0:
+            return None
+        return (self.asks.best[0]+self.bids.best[0])/2
+
+    def size_at(self, price):
+        return self.bids.size_at(price) or self.asks.size_at(price)
+
+    def top(self, n):
+        return self.bids.top(n), self.asks.top(n)
+
+    def __str__(self):
+        return f'order book {self.symbol}, bid:{self.best_bid}, ask:{self.best_ask}, levels:{len(self.bids)}/{len(self.asks)}'
+
+    def __repr__(self):
+        return self.__str__()
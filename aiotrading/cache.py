@@ -0,0 +1,181 @@
+import logging
+import sqlite3
+import time
+from datetime import datetime
+from decimal import Decimal
+from .candle import Candle
+from .trade import Trade
+from .timeframe import timeframe_floor_ms, timeframe_next_ms
+
+log = logging.getLogger('aiotrading')
+
+schema = '''
+create table if not exists candles (
+    symbol text, timeframe text, open_time integer, update_time integer,
+    open text, high text, low text, close text, volume text, buy_volume text, trades integer,
+    primary key (symbol, timeframe, open_time)) without rowid;
+create table if not exists trades (
+    symbol text, id integer, time integer, price text, volume text, buy integer,
+    primary key (symbol, id)) without rowid;
+create index if not exists trades_time on trades (symbol, time);
+create table if not exists spans (
+    symbol text, timeframe text, start integer, end integer,
+    primary key (symbol, timeframe, start)) without rowid;
+'''
+
+def to_ms(t):
+    return int(t.timestamp()*1000)
+
+def align_ms(ms, timeframe): # open time of the first bar at or after ms, which is where klines start
+    start = timeframe_floor_ms(ms, timeframe)
+    return start if start == ms else timeframe_next_ms(ms, timeframe)
+
+class HistoryCache: # sqlite store of closed candles and trades; spans record candle ranges known to be complete
+
+    def __init__(self, path, max_age=None, max_rows=None):
+        self.path = path
+        self.max_age = max_age # timedelta, older rows are evicted
+        self.max_rows = max_rows # per symbol and timeframe, oldest rows are evicted
+        self.db = None
+
+    def open(self):
+        log.info(f'opening {self}')
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(schema)
+        self.evict()
+
+    def close(self):
+        log.info(f'closing {self}')
+        self.db.commit()
+        self.db.close()
+        self.db = None
+
+    async def candle_history(self, fetch, symbol, timeframe, start_time, count):
+        # serve from disk what is covered and fetch(start_time, count) only the holes and the tail
+        candles = []
+        cursor = align_ms(to_ms(start_time), timeframe) # spans start on bar boundaries
+        while len(candles) < count:
+            span = self.db.execute('select start, end from spans where symbol=? and timeframe=? and start<=? and end>=?',
+                (symbol, timeframe, cursor, cursor)).fetchone()
+            if span is not None:
+                rows = self.load_candles(symbol, timeframe, cursor, span[1], count-len(candles))
+                candles += rows
+                cursor = timeframe_next_ms(span[1], timeframe)
+                continue
+            log.debug(f'cache miss: {symbol}, {timeframe} from {datetime.fromtimestamp(cursor/1000)}')
+            n = count-len(candles)
+            row = self.db.execute('select min(start) from spans where symbol=? and timeframe=? and start>?', (symbol, timeframe, cursor)).fetchone()
+            if row[0] is not None and not timeframe.endswith('M'): # stop at the next cached span
+                n = max(1, min(n, (row[0]-cursor)//(timeframe_next_ms(cursor, timeframe)-cursor)))
+            fetched = await fetch(datetime.fromtimestamp(cursor/1000), n)
+            if len(fetched) == 0:
+                break
+            self.store_candles(symbol, timeframe, cursor, fetched)
+            candles += fetched
+            cursor = timeframe_next_ms(to_ms(fetched[-1].open_time), timeframe)
+        return candles[:count]
+
+    async def trade_history(self, fetch, symbol, start_time, count, start_id=None):
+        # aggregate trade ids are consecutive, so a hole is simply a missing id
+        if start_id is None:
+            row = self.db.execute('select id from trades where symbol=? and time<? order by id desc limit 1', (symbol, to_ms(start_time))).fetchone()
+            if row is not None and self.db.execute('select 1 from trades where symbol=? and id=?', (symbol, row[0]+1)).fetchone():
+                start_id = row[0]+1
+        trades = []
+        while len(trades) < count:
+            if start_id is not None:
+                rows = self.load_trades(symbol, start_id, count-len(trades))
+                trades += rows
+                if len(trades) == count:
+                    break
+                if len(rows) > 0:
+                    start_id = rows[-1].id+1
+            log.debug(f'cache miss: {symbol} trades from {start_time}/{start_id}')
+            n = count-len(trades)
+            if start_id is not None: # stop at the next cached trade
+                row = self.db.execute('select min(id) from trades where symbol=? and id>?', (symbol, start_id)).fetchone()
+                if row[0] is not None:
+                    n = min(n, row[0]-start_id)
+            fetched = await fetch(start_time if start_id is None else None, n, start_id)
+            if len(fetched) == 0:
+                break
+            self.store_trades(symbol, fetched)
+            trades += fetched
+            start_id = fetched[-1].id+1
+        return trades[:count]
+
+    def load_candles(self, symbol, timeframe, start, end, limit):
+        rows = self.db.execute('select open_time, update_time, open, high, low, close, volume, buy_volume, trades from candles '
+            'where symbol=? and timeframe=? and open_time>=? and open_time<=? order by open_time limit ?',
+            (symbol, timeframe, start, end, limit))
+        return [Candle(symbol=symbol, timeframe=timeframe, open_time=datetime.fromtimestamp(r[0]/1000),
+            update_time=datetime.fromtimestamp(r[1]/1000), open=Decimal(r[2]), high=Decimal(r[3]), low=Decimal(r[4]),
+            close=Decimal(r[5]), volume=Decimal(r[6]), buy_volume=Decimal(r[7]), trades=r[8], closed=True) for r in rows]
+
+    def load_trades(self, symbol, start_id, limit):
+        rows = self.db.execute('select id, time, price, volume, buy from trades where symbol=? and id>=? order by id limit ?',
+            (symbol, start_id, limit))
+        trades = []
+        for r in rows:
+            if r[0] != start_id+len(trades):
+                break # hole
+            trades.append(Trade(symbol=symbol, id=r[0], time=datetime.fromtimestamp(r[1]/1000),
+                price=Decimal(r[2]), volume=Decimal(r[3]), buy=bool(r[4])))
+        return trades
+
+    def store_candles(self, symbol, timeframe, start, candles):
+        now = time.time()*1000
+        closed = [c for c in candles if c.closed and to_ms(c.update_time) < now]
+        if len(closed) == 0:
+            return
+        self.db.executemany('insert or replace into candles values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(symbol, timeframe, to_ms(c.open_time), to_ms(c.update_time), str(c.open), str(c.high), str(c.low),
+                str(c.close), str(c.volume), str(c.buy_volume), c.trades) for c in closed])
+        self.add_span(symbol, timeframe, start, to_ms(closed[-1].open_time))
+        self.db.commit()
+
+    def store_trades(self, symbol, trades):
+        self.db.executemany('insert or replace into trades values (?, ?, ?, ?, ?, ?)',
+            [(symbol, t.id, to_ms(t.time), str(t.price), str(t.volume), int(t.buy)) for t in trades])
+        self.db.commit()
+
+    def add_span(self, symbol, timeframe, start, end):
+        # merge with overlapping or adjacent spans
+        q = (symbol, timeframe, timeframe_next_ms(end, timeframe), timeframe_floor_ms(start-1, timeframe))
+        rows = self.db.execute('select start, end from spans where symbol=? and timeframe=? and start<=? and end>=?', q).fetchall()
+        self.db.execute('delete from spans where symbol=? and timeframe=? and start<=? and end>=?', q)
+        for s, e in rows:
+            start, end = min(start, s), max(end, e)
+        self.db.execute('insert into spans values (?, ?, ?, ?)', (symbol, timeframe, start, end))
+
+    def evict(self):
+        if self.max_age is not None:
+            t = to_ms(datetime.now()-self.max_age)
+            self.db.execute('delete from candles where open_time<?', (t,))
+            self.db.execute('delete from trades where time<?', (t,))
+        if self.max_rows is not None:
+            for symbol, timeframe in self.db.execute('select distinct symbol, timeframe from candles').fetchall():
+                self.db.execute('delete from candles where symbol=? and timeframe=? and open_time<(select open_time from candles '
+                    'where symbol=? and timeframe=? order by open_time desc limit 1 offset ?)',
+                    (symbol, timeframe, symbol, timeframe, self.max_rows-1))
+            for symbol, in self.db.execute('select distinct symbol from trades').fetchall():
+                self.db.execute('delete from trades where symbol=? and id<(select id from trades where symbol=? order by id desc limit 1 offset ?)',
+                    (symbol, symbol, self.max_rows-1))
+        if self.max_age is None and self.max_rows is None:
+            return
+        # spans must not claim evicted candles
+        self.db.execute('update spans set start=(select min(open_time) from candles c where c.symbol=spans.symbol and '
+            'c.timeframe=spans.timeframe and c.open_time between spans.start and spans.end)')
+        self.db.execute('delete from spans where start is null')
+        self.db.commit()
+
+    def compact(self):
+        log.info(f'compacting {self}')
+        self.evict()
+        self.db.execute('vacuum')
+
+    def __str__(self):
+        return f'history cache {self.path}'
+
+    def __repr__(self):
+        return self.__str__()
@@ -1,6 +1,7 @@
-
 class Candle:
 
+    __slots__ = ('symbol', 'timeframe', 'open_time', 'update_time', 'open', 'high', 'low', 'close', 'volume', 'buy_volume', 'trades', 'closed')
+
     def __init__(self, symbol, timeframe, open_time, update_time, open, high, low, close, volume, buy_volume, trades, closed):
         self.symbol = symbol
         self.timeframe = timeframe
@@ -15,6 +16,17 @@ class Candle:
         self.trades = trades
         self.closed = closed
 
+    def astuple(self):
+        return (self.symbol, self.timeframe, self.open_time, self.update_time, self.open, self.high, self.low, self.close, self.volume, self.buy_volume, self.trades, self.closed)
+
+    def __eq__(self, other):
+        if not isinstance(other, Candle):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __hash__(self):
+        return hash((self.symbol, self.timeframe, self.open_time, self.update_time))
+
     def __str__(self):
         return f'candle {self.symbol}, {self.timeframe}, t:{self.open_time}, o:{self.open}, h:{self.high}, l:{self.low}, c:{self.close}, v:{self.volume}'
 
@@ -1,5 +1,8 @@
 from .binance_futures import BinanceFutures
+from .recorder import FrameRecorder, FrameReplay
 
 __all__ = (
     BinanceFutures,
+    FrameRecorder,
+    FrameReplay,
 )
\ No newline at end of file
@@ -4,136 +4,348 @@ import json
 import time
 import hmac
 import random
+import zlib
 import aiohttp
 import websockets
 from datetime import datetime, timedelta
 from decimal import Decimal
 from collections import defaultdict
-from websockets.exceptions import ConnectionClosedOK
 from urllib.parse import urlencode
 from .exchange import Exchange
-from .. import Candle, Trade, Order, OrderUpdate, CandleStream, TradeStream, OrderUpdateStream
+from .rate_limiter import RateLimiter
+from .metrics import LatencyStats
+from .shard import WebsocketShard
+from .binance_messages import BinanceCandle, BinanceTrade, BinanceBookTicker, BinanceMarkPrice, BinanceDepthUpdate
+from . import decoder
+from .. import Candle, Trade, Order, OrderUpdate, Balance, Position, Account, CandleFrame, TradeFrame, OrderBook
+from ..symbol import SymbolInfo
+from .. import CandleStream, TradeStream, OrderBookStream, BookTickerStream, MarkPriceStream, OrderUpdateStream, AccountStream
+from ..timeframe import timeframe_delta, split_time_range
 
 log = logging.getLogger('aiotrading')
 
 class BinanceFutures(Exchange):
 
-    def __init__(self, api_key=None, api_secret=None):
+    rest_intervals = {'SECOND': ('S', 1), 'MINUTE': ('M', 60), 'HOUR': ('H', 3600), 'DAY': ('D', 86400)}
+    mws_stream_types = (CandleStream, TradeStream, OrderBookStream, BookTickerStream, MarkPriceStream)
+    wsa_methods = {('order', 'POST'): 'order.place', ('order', 'DELETE'): 'order.cancel', ('order', 'GET'): 'order.status'}
+
+    def __init__(self, api_key=None, api_secret=None, pool_size=100, dns_cache_ttl=300, keepalive_timeout=60,
+            ws_max_streams=200, ws_shard_count=None, ws_reconnect_delay=1, ws_reconnect_max_delay=60, ws_backfill_limit=10000,
+            ws_batch_window=0.05, cache=None, order_transport='rest', recorder=None, offline=False):
         self.api_key = api_key
         self.api_secret = api_secret
         self.name = 'binance-futures'
         self.rest_uri = 'https://fapi.binance.com/fapi/v1/'
         self.rest_limits = {}
+        self.rest_limiter = RateLimiter()
+        self.rest_pool_size = pool_size
+        self.rest_dns_cache_ttl = dns_cache_ttl
+        self.rest_keepalive_timeout = keepalive_timeout
+        self.rest_session = None
+        self.rest_latency = defaultdict(LatencyStats)
+        self.symbols = {} # symbol -> SymbolInfo of trading symbols, loaded on open
+        self.cache = cache # optional HistoryCache serving candle/trade history from disk
         self.ws_uri = 'wss://fstream.binance.com/'
         self.ws_lock = asyncio.Lock()
-        self.mws_streams = defaultdict(set)
+        self.mws_streams = {} # endpoint -> tuple of streams, replaced on change so dispatch needs no lock
         self.mws_connected = set() 
+        self.mws_max_streams = ws_max_streams # per connection
+        self.mws_shard_count = ws_shard_count # hash endpoints to shards by symbol if set
+        self.mws_shards = []
+        self.mws_endpoint_shard = {}
+        self.mws_batch_window = ws_batch_window # collect subscription changes for this long before sending
+        self.mws_sync_future = None
+        self.mws_acks = {}
+        self.mws_books = {} # endpoint -> OrderBook shared by the streams of the symbol
+        self.mws_book_buffers = {} # endpoint -> depth updates held while a snapshot loads
+        self.mws_book_tasks = {}
+        self.mws_book_fresh = set() # endpoints whose book awaits its first update after a snapshot
+        self.mws_book_limit = 1000 # snapshot depth
+        self.ws_last_id = 0
+        self.ws_message_interval = 0.1 # incoming message limit per connection
+        self.ws_ack_timeout = 10
+        self.ws_reconnect_delay = ws_reconnect_delay
+        self.ws_reconnect_max_delay = ws_reconnect_max_delay
+        self.ws_backfill_limit = ws_backfill_limit # max items fetched per endpoint after a reconnect
         self.mws_persisted = set()
+        self.wsa_uri = 'wss://ws-fapi.binance.com/ws-fapi/v1'
+        self.wsa = None # websocket api connection, opened on first use
+        self.wsa_task = None
+        self.wsa_lock = asyncio.Lock()
+        self.wsa_pending = {} # request id -> future of the response
+        self.wsa_latency = defaultdict(LatencyStats)
+        self.order_transport = order_transport # rest or ws, for order calls that do not choose
         self.uws_streams = set()
+        self.uws_order_streams = {} # order id -> tuple of streams, None for streams of all orders
+        self.uws_order_keys = {} # stream -> key it is indexed under, the Order itself until submit assigns an id
+        self.uws_account_streams = ()
         self.uws_connected = False
         self.uws_persisted = False
-        self.orders = {}
+        self.orders = {} # submitted here and not final yet, oldest first
+        self.orders_sending = set() # ids of orders whose submit request has not returned yet
+        self.order_updates = {} # last update delivered per order id
+        self.max_orders = 10000 # beyond this, the oldest orders not known to be open are forgotten
+        self.account = Account()
+        self.recorder = recorder # optional FrameRecorder of every websocket frame received
+        self.offline = offline # no connections, streams are fed by replay
         
     async def open(self):
+        if self.cache is not None:
+            self.cache.open()
+        if self.recorder is not None:
+            self.recorder.open()
+        if self.offline:
+            log.info(f'opening exchange offline: {self}')
+            return
         log.info(f'connecting to exchange: {self}')
-        j = await self.request('exchangeInfo')
-        self.symbols = {d['symbol']: d for d in j['symbols'] if d['status']=='TRADING'}
-        log.debug(f'exchange has {len(self.symbols)} symbols')
-        for l in j['rateLimits']:
-            if l['intervalNum']==1 and l['interval']=='MINUTE' and l['rateLimitType'] == 'REQUEST_WEIGHT':
-                self.rest_limits['X-MBX-USED-WEIGHT-1M'] = (l['limit'], 60)
-            elif l['intervalNum']==1 and l['interval']=='MINUTE' and l['rateLimitType'] == 'ORDERS':
-                self.rest_limits['X-MBX-ORDER-COUNT-1M'] = (l['limit'], 60)
-            else:
-                raise Exception(f'unrecognized exchange limit: {l}')
-        log.debug('exchange rate limits per second: %s', self.rest_limits)
+        self.rest_connect()
+        try:
+            j = await self.request('exchangeInfo')
+            self.symbols = {d['symbol'].lower(): self.rest_parse_symbol(d) for d in j['symbols'] if d['status']=='TRADING'}
+            log.debug(f'exchange has {len(self.symbols)} symbols')
+            for l in j['rateLimits']:
+                h, kind = self.rest_limit_header(l)
+                per = self.rest_intervals[l['interval']][1]
+                self.rest_limits[h] = (l['limit'], l['intervalNum']*per)
+                self.rest_limiter.add(h, kind, l['limit'], l['intervalNum']*per)
+        except BaseException:
+            await self.close() # __aexit__ does not run when __aenter__ fails
+            raise
+        log.debug('exchange rate limits: %s', self.rest_limiter)
 
     async def close(self):
         log.info(f'disconnecting from exchange: {self}')
+        await self.rest_disconnect()
+        await self.wsa_disconnect()
+        if self.cache is not None:
+            self.cache.close()
+        if self.recorder is not None:
+            self.recorder.close()
 
-    async def candle_history(self, symbol, timeframe, start_time, count):
-        batch = 1500
-        log.info(f'fetching candle history of length {count} for {symbol}, {timeframe} from {start_time}')
+    async def candle_history(self, symbol, timeframe, start_time, count, frame=False):
+        if self.cache is not None:
+            async def fetch(start_time, count):
+                return [c async for c in self.iter_candle_history(symbol, timeframe, start_time, count)]
+            candles = await self.cache.candle_history(fetch, symbol, timeframe, start_time, count)
+            return CandleFrame.from_candles(symbol, timeframe, candles) if frame else candles
+        if frame:
+            log.info(f'fetching candle frame of length {count} for {symbol}, {timeframe} from {start_time}')
+            candles = CandleFrame(symbol, timeframe, capacity=count)
+            async for page in self.rest_prefetch(self.candle_history_pages(symbol, timeframe, start_time, count, raw=True), 2):
+                candles.append_klines(page)
+            return candles
         candles = []
-        remained = count
-        while remained>0:
-            count = min(remained, batch)
-            log.debug(f'batch: {start_time}, {count}')
-            params = {'symbol': symbol.upper(), 'interval': timeframe, 'startTime': int(start_time.timestamp()*1000), 'limit': count}
-            j = await self.request('klines', params=params)
-            if len(j) == 0:
-                break
-            for d in j:
-                c = Candle(symbol=symbol, timeframe=timeframe, open_time=datetime.fromtimestamp(d[0]/1000),
-                        open=Decimal(d[1]), high=Decimal(d[2]), low=Decimal(d[3]), close=Decimal(d[4]),
-                        volume=Decimal(d[5]), trades=d[8], buy_volume=Decimal(d[9]),
-                        closed=True, update_time=datetime.fromtimestamp(d[6]/1000)
-                    )
-                candles.append(c)
-            remained -= count
-            start_time = candles[-1].open_time+timedelta(minutes=1)
+        async for page in self.iter_candle_history(symbol, timeframe, start_time, count, pages=True):
+            candles += page
         return candles
 
-    async def trade_history(self, symbol, start_time, count, start_id=None):
-        batch = 1000
-        log.info(f'fetching trade history of length {count} for {symbol} from {start_time}/{start_id}')
+    async def trade_history(self, symbol, start_time, count, start_id=None, frame=False):
+        if self.cache is not None:
+            async def fetch(start_time, count, start_id):
+                return [t async for t in self.iter_trade_history(symbol, start_time, count, start_id)]
+            trades = await self.cache.trade_history(fetch, symbol, start_time, count, start_id)
+            return TradeFrame.from_trades(symbol, trades) if frame else trades
+        if frame:
+            log.info(f'fetching trade frame of length {count} for {symbol} from {start_time}/{start_id}')
+            trades = TradeFrame(symbol, capacity=count)
+            async for page in self.rest_prefetch(self.trade_history_pages(symbol, start_time, count, start_id, raw=True), 2):
+                trades.append_agg_trades(page)
+            return trades
         trades = []
-        remained = count
-        while remained>0:
-            count = min(remained, batch)
-            log.debug(f'batch: {start_time}, {count}')
-            params = {'symbol': symbol.upper(), 'limit': count}
-            if start_id is not None:
-                params['fromId'] = start_id
-            elif start_time is not None:
-                params['startTime'] = int(start_time.timestamp()*1000)
-            else:
-                raise Exception(f'either start_time or start_id should be specified')
-            j = await self.request('aggTrades', params=params)
-            if len(j) == 0:
-                break
-            for d in j:
-                t = Trade(
-                    symbol = symbol,
-                    id = d['a'],
-                    time=datetime.fromtimestamp(d['T']/1000),
-                    price=Decimal(d['p']),
-                    volume=Decimal(d['q']),
-                    buy = d['m']
-                )
-                trades.append(t)
-            remained -= count
-            start_id = trades[-1].id+1
-            start_time = None
+        async for page in self.iter_trade_history(symbol, start_time, count, start_id, pages=True):
+            trades += page
         return trades
-        
-    async def submit_order(self, order):
+
+    async def iter_candle_history(self, symbol, timeframe, start_time, count, pages=False, prefetch=2):
+        log.info(f'fetching candle history of length {count} for {symbol}, {timeframe} from {start_time}')
+        async for page in self.rest_prefetch(self.candle_history_pages(symbol, timeframe, start_time, count), prefetch):
+            if pages:
+                yield page
+            else:
+                for c in page:
+                    yield c
+
+    async def iter_trade_history(self, symbol, start_time, count, start_id=None, pages=False, prefetch=2):
+        log.info(f'fetching trade history of length {count} for {symbol} from {start_time}/{start_id}')
+        async for page in self.rest_prefetch(self.trade_history_pages(symbol, start_time, count, start_id), prefetch):
+            if pages:
+                yield page
+            else:
+                for t in page:
+                    yield t
+
+    async def candle_backfill(self, symbols, timeframe, start_time, end_time, concurrency=10):
+        batch = 1500
+        log.info(f'backfilling candles for {symbols}, {timeframe} from {start_time} to {end_time}')
+        ranges = split_time_range(start_time, end_time, timeframe_delta(timeframe)*batch)
+        semaphore = asyncio.Semaphore(concurrency)
+        async def fetch(symbol, t0, t1):
+            async with semaphore:
+                log.debug(f'batch: {symbol}, {t0}, {t1}')
+                params = {'symbol': symbol.upper(), 'interval': timeframe, 'limit': batch,
+                    'startTime': int(t0.timestamp()*1000), 'endTime': int(t1.timestamp()*1000)-1}
+                j = await self.request('klines', params=params)
+                return [self.rest_parse_candle(symbol, timeframe, d) for d in j]
+        pages = await asyncio.gather(*[fetch(symbol, t0, t1) for symbol in symbols for t0, t1 in ranges])
+        result = {}
+        for i, symbol in enumerate(symbols):
+            candles = []
+            for page in pages[i*len(ranges):(i+1)*len(ranges)]:
+                for c in page:
+                    if (len(candles)==0 or c.open_time>candles[-1].open_time) and c.open_time<end_time:
+                        candles.append(c)
+            result[symbol] = candles
+        return result
+
+    async def trade_backfill(self, symbols, start_time, end_time, concurrency=10):
+        batch = 1000
+        log.info(f'backfilling trades for {symbols} from {start_time} to {end_time}')
+        ranges = split_time_range(start_time, end_time, timedelta(hours=1)) # aggTrades time window limit
+        semaphore = asyncio.Semaphore(concurrency)
+        async def fetch(symbol, t0, t1):
+            trades = []
+            async with semaphore:
+                log.debug(f'batch: {symbol}, {t0}, {t1}')
+                params = {'symbol': symbol.upper(), 'limit': batch,
+                    'startTime': int(t0.timestamp()*1000), 'endTime': int(t1.timestamp()*1000)-1}
+                while True:
+                    j = await self.request('aggTrades', params=params)
+                    for d in j:
+                        t = self.rest_parse_trade(symbol, d)
+                        if t.time >= t1:
+                            return trades
+                        trades.append(t)
+                    if len(j) < batch:
+                        return trades
+                    params = {'symbol': symbol.upper(), 'limit': batch, 'fromId': trades[-1].id+1}
+        pages = await asyncio.gather(*[fetch(symbol, t0, t1) for symbol in symbols for t0, t1 in ranges])
+        result = {}
+        for i, symbol in enumerate(symbols):
+            trades = []
+            for page in pages[i*len(ranges):(i+1)*len(ranges)]:
+                for t in page:
+                    if len(trades)==0 or t.id>trades[-1].id:
+                        trades.append(t)
+            result[symbol] = trades
+        return result
+
+    async def submit_order(self, order, transport=None):
+        self.check_order(order) # rejected here rather than by a round trip
         order.id = self.gen_rand_id()
         log.info(f'submit order: {order}')
-        self.orders[order.id] = order
-        params = self.get_order_params(order)
-        await self.request('order', params=params, method='POST', sign=True)
+        self.track_order(order)
+        params = self.get_json_order_params(order)
+        self.orders_sending.add(order.id)
+        try:
+            await self.order_request('order', params, 'POST', transport)
+        except Exception:
+            self.orders.pop(order.id, None)
+            raise
+        finally:
+            self.orders_sending.discard(order.id)
         #return self.order_update_stream(order)
-        
-    # TODO: submit_orders
 
-    async def cancel_order(self, order):
+    async def submit_orders(self, orders, concurrency=10):
+        # batches of 5 are sent concurrently; returns, per order, None or the exception it failed with
+        all_orders = list(orders)
+        results = {}
+        for order in all_orders:
+            try:
+                self.check_order(order)
+            except Exception as e:
+                results[order] = e
+        orders = [order for order in all_orders if order not in results]
+        for order in orders:
+            order.id = self.gen_rand_id()
+            self.track_order(order)
+            self.orders_sending.add(order.id)
+        log.info(f'submit orders: {orders}')
+        semaphore = asyncio.Semaphore(concurrency)
+        async def submit(chunk):
+            params = {'batchOrders': json.dumps([self.get_json_order_params(order) for order in chunk])}
+            async with semaphore:
+                try:
+                    j = await self.request('batchOrders', params=params, method='POST', sign=True)
+                except Exception as e:
+                    return [e]*len(chunk)
+                finally:
+                    self.orders_sending.difference_update(order.id for order in chunk)
+            return [self.get_batch_error(d) for d in j]
+        chunks = [orders[i:i+5] for i in range(0, len(orders), 5)]
+        for chunk, rs in zip(chunks, await asyncio.gather(*[submit(chunk) for chunk in chunks])):
+            for order, r in zip(chunk, rs):
+                if r is not None:
+                    log.warning(f'submitting {order} failed: {r}')
+                    self.orders.pop(order.id, None)
+                results[order] = r
+        return [results[order] for order in all_orders]
+
+    async def cancel_order(self, order, transport=None):
         log.info(f'cancel order: {order}')
         params = {
-            'symbol': order.symbol,
+            'symbol': order.symbol.upper(),
             'origClientOrderId': order.id
         }
-        await self.request('order', params=params, method='DELETE', sign=True)
+        await self.order_request('order', params, 'DELETE', transport)
         # TODO: handle status 400
 
+    async def cancel_orders(self, orders, concurrency=10):
+        # batches of 10 orders of a symbol are sent concurrently; returns, per order, None or the exception it failed with
+        orders = list(orders)
+        log.info(f'cancel orders: {orders}')
+        symbols = defaultdict(list)
+        for order in orders:
+            symbols[order.symbol].append(order)
+        chunks = [group[i:i+10] for group in symbols.values() for i in range(0, len(group), 10)]
+        semaphore = asyncio.Semaphore(concurrency)
+        async def cancel(chunk):
+            params = {'symbol': chunk[0].symbol.upper(), 'origClientOrderIdList': json.dumps([order.id for order in chunk])}
+            async with semaphore:
+                try:
+                    j = await self.request('batchOrders', params=params, method='DELETE', sign=True)
+                except Exception as e:
+                    return [e]*len(chunk)
+            return [self.get_batch_error(d) for d in j]
+        results = {}
+        for chunk, rs in zip(chunks, await asyncio.gather(*[cancel(chunk) for chunk in chunks])):
+            for order, r in zip(chunk, rs):
+                if r is not None:
+                    log.warning(f'canceling {order} failed: {r}')
+                results[order] = r
+        return [results[order] for order in orders]
+
+    async def cancel_all_orders(self, symbol):
+        log.info(f'cancel all orders: {symbol}')
+        await self.request('allOpenOrders', params={'symbol': symbol.upper()}, method='DELETE', sign=True)
+
+    async def sync_account(self):
+        # seed the account from rest, the user stream keeps it current afterwards
+        log.info('syncing account')
+        t = datetime.now()
+        known = [id for id in self.orders if id not in self.orders_sending] # in flight orders may be missing from the snapshot
+        account, orders = await asyncio.gather(self.request('account', sign=True, version=2), self.request('openOrders', sign=True))
+        items = [self.rest_parse_balance(d) for d in account['assets']]
+        items += [self.rest_parse_position(d) for d in account['positions']]
+        items += [self.rest_parse_open_order(d) for d in orders]
+        for item in self.account.load(items, t):
+            await self.uws_notify(item)
+        # orders placed before the snapshot and missing from it are final, whether or not we saw it
+        open_ids = set(self.account.open_orders)
+        for id in known:
+            if id not in open_ids:
+                self.orders.pop(id, None)
+                self.order_updates.pop(id, None)
+        return self.account
+
     async def persist_streams(self, streams):
         log.info(f'persisting streams {streams}')
         m = []
         u = False
         for stream in streams:
-            if isinstance(stream, (CandleStream, TradeStream)):
+            if isinstance(stream, self.mws_stream_types):
                 m.append(self.mws_get_endpoint(stream))
-            elif isinstance(stream, (OrderUpdateStream,)):
+            elif isinstance(stream, (OrderUpdateStream, AccountStream)):
                 u = True
             else:
                 log.error(f'invalid stream type {type(stream)}')
@@ -145,10 +357,15 @@ class BinanceFutures(Exchange):
 
 # end of portable api
 
-    async def request(self, endpoint, params={}, headers={}, method='GET', sign=False):
-        t0 = time.time()
+    async def request(self, endpoint, params={}, headers={}, method='GET', sign=False, version=1, charge=True):
+        # charge is false when the caller already took the budget of this request
+        params = dict(params)
+        headers = dict(headers)
+        name = endpoint
+        if charge:
+            await self.rest_limiter.acquire(*self.rest_get_weight(endpoint, method, params))
         if sign:
-            params['timestamp'] = int(t0*1000)
+            params['timestamp'] = int(time.time()*1000)
             params['recvWindow'] = 10000
             qstr = urlencode(params)
             params = {}
@@ -156,45 +373,203 @@ class BinanceFutures(Exchange):
             qstr += '&signature=' + signature
             headers['X-MBX-APIKEY'] = self.api_key
             endpoint += '?' + qstr
-        async with aiohttp.request(method, self.rest_uri+endpoint, params=params, headers=headers) as resp:
+        session = self.rest_connect()
+        t0 = time.perf_counter()
+        uri = self.rest_uri if version == 1 else self.rest_uri.replace('/v1/', f'/v{version}/')
+        async with session.request(method, uri+endpoint, params=params, headers=headers) as resp:
+            self.rest_limiter.update(resp.headers)
             if resp.status != 200:
                 log.warning(f'rest resp status: {resp.status}')
                 log.warning(f'rest resp headers: {resp.headers}')
                 text = await resp.text()
                 log.warning(f'rest request text: {text}')
-                raise
-            j = await resp.json()
-            waits = []
-            for h, (limit, per) in self.rest_limits.items():
-                if h in resp.headers:
-                    used = float(resp.headers[h])
-                    remaining = limit - used
-                    wait = per/limit
-                    if remaining > limit/2:
-                        wait *= 0.5
-                    elif remaining < limit/2:
-                        wait *= 1.5
-                    wait -= (time.time() - t0)
-                    log.debug(f'{h} limit: {limit}, remaining: {remaining}, wait: {wait}')
-                    if wait<0:
-                        wait = 0
-                    waits += [wait]
-            if len(waits) > 0:
-                time.sleep(max(waits))
-            elif len(self.rest_limits)>0:
+                raise Exception(f'rest request {name} failed with status {resp.status}: {text}')
+            j = await resp.json(loads=decoder.loads)
+            self.rest_latency[name].add(time.perf_counter()-t0)
+            if len(self.rest_limits)>0 and not any(h in resp.headers for h in self.rest_limits):
                 for h in resp.headers:
                     if h.startswith('X-MBX-'):
                         raise Exception(f'unrecognized rate limit header: {h}')
             return j
             
+    async def order_request(self, endpoint, params, method, transport=None):
+        # a signed order call over the websocket api or rest; the websocket api falls back to rest
+        # only when the request could not be sent, otherwise the order might be placed twice
+        # the budget is taken once, so a fallback does not count the order twice
+        await self.rest_limiter.acquire(*self.rest_get_weight(endpoint, method, params))
+        if (transport or self.order_transport) == 'ws':
+            try:
+                return await self.wsa_request(self.wsa_methods[(endpoint, method)], params, 0, 0)
+            except ConnectionError as e:
+                log.warning(f'websocket api unavailable, using rest: {e!r}')
+        return await self.request(endpoint, params=params, method=method, sign=True, charge=False)
+
 # end of public api
 
+    async def candle_history_pages(self, symbol, timeframe, start_time, count, raw=False):
+        batch = 1500
+        remained = count
+        while remained>0:
+            count = min(remained, batch)
+            log.debug(f'batch: {start_time}, {count}')
+            params = {'symbol': symbol.upper(), 'interval': timeframe, 'startTime': int(start_time.timestamp()*1000), 'limit': count}
+            j = await self.request('klines', params=params)
+            if len(j) == 0:
+                break
+            yield j if raw else [self.rest_parse_candle(symbol, timeframe, d) for d in j]
+            remained -= count
+            start_time = datetime.fromtimestamp(j[-1][0]/1000)+timeframe_delta(timeframe)
+
+    async def trade_history_pages(self, symbol, start_time, count, start_id=None, raw=False):
+        batch = 1000
+        remained = count
+        while remained>0:
+            count = min(remained, batch)
+            log.debug(f'batch: {start_time}, {count}')
+            params = {'symbol': symbol.upper(), 'limit': count}
+            if start_id is not None:
+                params['fromId'] = start_id
+            elif start_time is not None:
+                params['startTime'] = int(start_time.timestamp()*1000)
+            else:
+                raise Exception(f'either start_time or start_id should be specified')
+            j = await self.request('aggTrades', params=params)
+            if len(j) == 0:
+                break
+            yield j if raw else [self.rest_parse_trade(symbol, d) for d in j]
+            remained -= count
+            start_id = j[-1]['a']+1
+            start_time = None
+
+    async def rest_prefetch(self, pages, prefetch):
+        # read ahead up to prefetch pages while the consumer works on the current one
+        queue = asyncio.Queue(maxsize=max(prefetch, 1))
+        async def producer():
+            try:
+                async for page in pages:
+                    await queue.put(page)
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
+        task = asyncio.get_event_loop().create_task(producer())
+        try:
+            while True:
+                page = await queue.get()
+                if page is None:
+                    break
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+        finally:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def rest_limit_header(self, l):
+        # the response header reporting usage of an exchangeInfo rate limit, and what it counts
+        if l['interval'] not in self.rest_intervals:
+            raise Exception(f'unrecognized exchange limit: {l}')
+        unit = self.rest_intervals[l['interval']][0]
+        if l['rateLimitType'] == 'REQUEST_WEIGHT':
+            return f'X-MBX-USED-WEIGHT-{l["intervalNum"]}{unit}', 'weight'
+        elif l['rateLimitType'] == 'ORDERS':
+            return f'X-MBX-ORDER-COUNT-{l["intervalNum"]}{unit}', 'orders'
+        raise Exception(f'unrecognized exchange limit: {l}')
+
+    async def wsa_connect(self):
+        async with self.wsa_lock:
+            if self.wsa is None:
+                log.debug('connecting to websocket api')
+                self.wsa = await websockets.connect(self.wsa_uri)
+                self.wsa_task = asyncio.get_event_loop().create_task(self.wsa_worker(self.wsa))
+            return self.wsa
+
+    async def wsa_disconnect(self):
+        if self.wsa is not None:
+            log.debug('disconnecting from websocket api')
+            ws, self.wsa = self.wsa, None
+            await ws.close()
+            self.wsa_task.cancel()
+            try:
+                await self.wsa_task
+            except asyncio.CancelledError:
+                pass
+
+    async def wsa_request(self, method, params, weight=1, orders=0):
+        # raises ConnectionError when nothing was sent
+        await self.rest_limiter.acquire(weight, orders)
+        params = dict(params, apiKey=self.api_key, timestamp=int(time.time()*1000))
+        qstr = urlencode(sorted(params.items()))
+        params['signature'] = hmac.new(self.api_secret.encode('utf-8'), qstr.encode('utf-8'), 'sha256').hexdigest()
+        self.ws_last_id += 1
+        id = self.ws_last_id
+        future = asyncio.get_event_loop().create_future()
+        self.wsa_pending[id] = future
+        try:
+            try:
+                ws = await self.wsa_connect() # reconnects after a drop
+                t0 = time.perf_counter()
+                await ws.send(json.dumps({'id': id, 'method': method, 'params': params}))
+            except Exception as e:
+                raise ConnectionError(f'websocket api request {method} not sent: {e!r}')
+            j = await asyncio.wait_for(future, self.ws_ack_timeout)
+            self.wsa_latency[method].add(time.perf_counter()-t0)
+            return j
+        finally:
+            self.wsa_pending.pop(id, None)
+
+    async def wsa_worker(self, ws):
+        log.debug('starting websocket api task')
+        try:
+            async for msg in ws:
+                j = decoder.loads(msg)
+                if 'rateLimits' in j: # same limits as rest, reported in the body
+                    self.rest_limiter.update({self.rest_limit_header(l)[0]: l['count'] for l in j['rateLimits']
+                        if l['rateLimitType'] in ('REQUEST_WEIGHT', 'ORDERS') and l['interval'] in self.rest_intervals})
+                future = self.wsa_pending.get(j.get('id'))
+                if future is None or future.done():
+                    continue
+                if j.get('status') == 200:
+                    future.set_result(j['result'])
+                else:
+                    future.set_exception(Exception(f'websocket api request failed: {j.get("error")}'))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.warning(f'websocket api connection lost: {e!r}')
+        finally:
+            if self.wsa is ws: # the next request reconnects
+                self.wsa = None
+            for future in self.wsa_pending.values():
+                if not future.done():
+                    future.set_exception(Exception('websocket api connection lost before a response'))
+        log.debug('websocket api task stopped')
+
+    def rest_connect(self):
+        if self.rest_session is None or self.rest_session.closed:
+            log.debug(f'creating rest session with pool size {self.rest_pool_size}')
+            connector = aiohttp.TCPConnector(
+                limit=self.rest_pool_size,
+                use_dns_cache=True,
+                ttl_dns_cache=self.rest_dns_cache_ttl,
+                keepalive_timeout=self.rest_keepalive_timeout,
+            )
+            self.rest_session = aiohttp.ClientSession(connector=connector)
+        return self.rest_session
+
+    async def rest_disconnect(self):
+        if self.rest_session is not None:
+            log.debug(f'closing rest session')
+            await self.rest_session.close()
+            self.rest_session = None
+
     async def open_stream(self, stream):
         log.info(f'opening {stream}')
-        if isinstance(stream, (CandleStream, TradeStream)):
-            async with self.ws_lock:
-                await self.mws_open(stream)
-        elif isinstance(stream, (OrderUpdateStream,)):
+        if isinstance(stream, self.mws_stream_types):
+            await self.mws_open(stream)
+        elif isinstance(stream, (OrderUpdateStream, AccountStream)):
             async with self.ws_lock:
                 await self.uws_open(stream)
         else:
@@ -202,10 +577,9 @@ class BinanceFutures(Exchange):
         
     async def close_stream(self, stream):
         log.info(f'closing {stream}')
-        if isinstance(stream, (CandleStream, TradeStream)):
-            async with self.ws_lock:
-                await self.mws_close(stream)
-        elif isinstance(stream, (OrderUpdateStream,)):
+        if isinstance(stream, self.mws_stream_types):
+            await self.mws_close(stream)
+        elif isinstance(stream, (OrderUpdateStream, AccountStream)):
             async with self.ws_lock:
                 await self.uws_close(stream)
         else:
@@ -214,21 +588,45 @@ class BinanceFutures(Exchange):
     async def mws_connect(self, endpoints):
         log.debug(f'connecting to market websocket endpoints {endpoints}')
         tgt = set(endpoints)-self.mws_connected
-        if len(tgt)>0:
-            t0 = time.time()
-            if len(self.mws_connected)==0:
-                uri = f'{self.ws_uri}stream?streams=' + '/'.join(tgt)
-                self.mws = await websockets.connect(uri)
-                self.mws_task = asyncio.get_event_loop().create_task(self.mws_worker())
-            else:
-                msg = json.dumps({'method': 'SUBSCRIBE', 'params': list(tgt), 'id': 1})
-                await self.mws.send(msg)
-            await self.ws_rate_limit(t0)
-            self.mws_connected = self.mws_connected.union(tgt)
+        groups = defaultdict(set)
+        for endpoint in tgt:
+            shard = self.mws_assign_shard(endpoint)
+            shard.endpoints.add(endpoint)
+            self.mws_endpoint_shard[endpoint] = shard
+            groups[shard].add(endpoint)
+        results = await asyncio.gather(*[self.mws_connect_shard(shard, eps) for shard, eps in groups.items()], return_exceptions=True)
+        error = None
+        for (shard, eps), r in zip(groups.items(), results):
+            if isinstance(r, Exception):
+                log.warning(f'connecting {eps} on {shard} failed: {r!r}')
+                error = error or r
+                shard.endpoints -= eps # roll back, so a retry assigns them again
+                for endpoint in eps:
+                    self.mws_endpoint_shard.pop(endpoint, None)
+                tgt -= eps
+                if shard.ws is None and len(shard) == 0:
+                    self.mws_shards.remove(shard)
+        self.mws_connected = self.mws_connected.union(tgt)
+        if error is not None:
+            raise error
+
+    async def mws_connect_shard(self, shard, endpoints):
+        if self.offline:
+            return
+        if shard.ws is None:
+            log.debug(f'connecting {shard}')
+            uri = f'{self.ws_uri}stream?streams=' + '/'.join(endpoints)
+            shard.ws = await websockets.connect(uri)
+            shard.send_time = time.monotonic()
+            shard.task = asyncio.get_event_loop().create_task(self.mws_worker(shard))
+        elif not shard.reconnecting:
+            await self.mws_send(shard, 'SUBSCRIBE', list(endpoints))
 
     async def uws_connect(self):
         log.debug(f'connecting to user websocket')
-        if not self.uws_connected:
+        if self.offline:
+            self.uws_connected = True
+        elif not self.uws_connected:
             t0 = time.time()
             listen_key = await self.uws_create_key()
             self.uws = await websockets.connect(f'{self.ws_uri}ws/{listen_key}')
@@ -238,35 +636,110 @@ class BinanceFutures(Exchange):
 
     async def mws_disconnect(self, endpoints):
         log.debug(f'disconnecting from market websocket endpoints {endpoints}')
-        tgt = set(endpoints)-self.mws_persisted
-        if len(tgt)>0:
-            t0 = time.time()  
-            if tgt == self.mws_connected:
-                await self.mws.close()
-                self.mws_task.cancel()
+        tgt = (set(endpoints)&self.mws_connected)-self.mws_persisted
+        groups = defaultdict(set)
+        for endpoint in tgt:
+            groups[self.mws_endpoint_shard.pop(endpoint)].add(endpoint)
+        await asyncio.gather(*[self.mws_disconnect_shard(shard, eps) for shard, eps in groups.items()])
+        self.mws_connected -= tgt
+
+    async def mws_disconnect_shard(self, shard, endpoints):
+        if endpoints == shard.endpoints:
+            log.debug(f'disconnecting {shard}')
+            self.mws_shards.remove(shard)
+            if shard.ws is not None:
+                await shard.ws.close()
+                shard.task.cancel()
                 try:
-                    await self.mws_task
+                    await shard.task
                 except asyncio.CancelledError:
                     pass
-            else:
-                msg = json.dumps({'method': 'UNSUBSCRIBE', 'params': list(tgt), 'id': 1})
-                await self.mws.send(msg)
-            await self.ws_rate_limit(t0)
-            self.mws_connected -= tgt
+                except Exception as e:
+                    log.warning(f'{shard} task had failed: {e!r}')
+        elif not self.offline:
+            await self.mws_send(shard, 'UNSUBSCRIBE', list(endpoints))
+        shard.endpoints -= endpoints
+
+    async def mws_send(self, shard, method, params):
+        wait = shard.send_time+self.ws_message_interval-time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self.ws_last_id += 1
+        id = self.ws_last_id
+        future = asyncio.get_event_loop().create_future()
+        self.mws_acks[id] = future
+        try:
+            await shard.ws.send(json.dumps({'method': method, 'params': params, 'id': id}))
+            shard.send_time = time.monotonic()
+            await asyncio.wait_for(future, self.ws_ack_timeout)
+        except asyncio.TimeoutError:
+            log.warning(f'no response to {method} on {shard}')
+        finally:
+            self.mws_acks.pop(id, None)
+
+    def mws_ack(self, msg):
+        future = self.mws_acks.get(msg['id'])
+        if future is None or future.done():
+            return
+        if 'error' in msg:
+            future.set_exception(Exception(f'websocket request failed: {msg["error"]}'))
+        else:
+            future.set_result(msg.get('result'))
+
+    async def mws_sync(self):
+        # changes requested within the batch window are coalesced into one diff against mws_connected
+        if self.mws_sync_future is None:
+            self.mws_sync_future = asyncio.get_event_loop().create_future()
+            asyncio.get_event_loop().create_task(self.mws_sync_worker(self.mws_sync_future))
+        await asyncio.shield(self.mws_sync_future)
+
+    async def mws_sync_worker(self, future):
+        await asyncio.sleep(self.mws_batch_window)
+        self.mws_sync_future = None
+        try:
+            async with self.ws_lock:
+                wanted = set(self.mws_streams)|self.mws_persisted
+                await self.mws_disconnect(self.mws_connected-wanted)
+                await self.mws_connect(wanted-self.mws_connected)
+            future.set_result(None)
+        except Exception as e:
+            future.set_exception(e)
+
+    def mws_assign_shard(self, endpoint):
+        if self.mws_shard_count is not None:
+            symbol = endpoint.split('@')[0]
+            id = zlib.crc32(symbol.encode('utf-8'))%self.mws_shard_count
+            shard = next((s for s in self.mws_shards if s.id==id), None)
+            if shard is None:
+                shard = WebsocketShard(id)
+                self.mws_shards.append(shard)
+            if len(shard) < self.mws_max_streams:
+                return shard
+        for shard in self.mws_shards:
+            if len(shard) < self.mws_max_streams:
+                return shard
+        id = max([s.id for s in self.mws_shards]+[(self.mws_shard_count or 0)-1])+1
+        shard = WebsocketShard(id)
+        self.mws_shards.append(shard)
+        return shard
 
     async def uws_disconnect(self):
         log.debug(f'disconnecting from user websocket')
         if self.uws_connected and not self.uws_persisted:
             t0 = time.time()  
+            self.uws_connected = False
+            if self.offline:
+                return
             await self.uws.close()
             self.uws_task.cancel()
             try:
                 await self.uws_task
             except asyncio.CancelledError:
                 pass
+            except Exception as e:
+                log.warning(f'user websocket task had failed: {e!r}')
             await self.uws_delete_key()
             await self.ws_rate_limit(t0)
-            self.uws_connected = False
             
     async def mws_persist(self, endpoints):
         log.debug(f'persisting market websocket endpoints {endpoints}')
@@ -283,116 +756,485 @@ class BinanceFutures(Exchange):
             return f'{stream.symbol}@kline_{stream.timeframe}'
         if isinstance(stream, TradeStream):
             return f'{stream.symbol}@aggTrade'
+        if isinstance(stream, OrderBookStream):
+            return f'{stream.symbol}@depth@100ms'
+        if isinstance(stream, BookTickerStream):
+            return f'{stream.symbol}@bookTicker' if stream.symbol is not None else '!bookTicker'
+        if isinstance(stream, MarkPriceStream):
+            suffix = '@1s' if stream.interval == '1s' else ''
+            return f'{stream.symbol}@markPrice{suffix}' if stream.symbol is not None else f'!markPrice@arr{suffix}'
         raise Exception(f'invalid stream type {type(stream)}')
         
+    def rest_parse_candle(self, symbol, timeframe, d):
+        return Candle(symbol=symbol, timeframe=timeframe, open_time=datetime.fromtimestamp(d[0]/1000),
+                open=Decimal(d[1]), high=Decimal(d[2]), low=Decimal(d[3]), close=Decimal(d[4]),
+                volume=Decimal(d[5]), trades=d[8], buy_volume=Decimal(d[9]),
+                closed=d[6] < time.time()*1000, update_time=datetime.fromtimestamp(d[6]/1000)
+            )
+
+    def rest_parse_trade(self, symbol, d):
+        return Trade(
+            symbol = symbol,
+            id = d['a'],
+            time=datetime.fromtimestamp(d['T']/1000),
+            price=Decimal(d['p']),
+            volume=Decimal(d['q']),
+            buy = d['m']
+        )
+
     def mws_parse_message(self, msg):
+        # only the event type and symbol are read here, the models convert fields when accessed
         if 'stream' in msg:
             d = msg['data']
-            if d['e'] == 'kline':
-                return Candle(
-                    symbol = d['s'].lower(),
-                    timeframe = d['k']['i'],
-                    open_time=datetime.fromtimestamp(d['k']['t']/1000),
-                    update_time=datetime.fromtimestamp(d['k']['T']/1000), #?d['E']
-                    open=Decimal(d['k']['o']),
-                    high=Decimal(d['k']['h']),
-                    low=Decimal(d['k']['l']),
-                    close=Decimal(d['k']['c']),
-                    volume=Decimal(d['k']['v']),
-                    buy_volume = Decimal(d['k']['V']),
-                    trades=int(d['k']['n']),
-                    closed=d['k']['x'])
-            if d['e'] == 'aggTrade':
-                return Trade(
-                    symbol = d['s'].lower(),
-                    id = d['a'],
-                    time=datetime.fromtimestamp(d['T']/1000),
-                    price=Decimal(d['p']),
-                    volume=Decimal(d['q']),
-                    buy = d['m']
-                )
+            if type(d) is list: # all market arrays
+                return [BinanceMarkPrice(x['s'].lower(), x) for x in d]
+            e = d['e']
+            if e == 'kline':
+                return BinanceCandle(d['s'].lower(), d['k'])
+            if e == 'aggTrade':
+                return BinanceTrade(d['s'].lower(), d)
+            if e == 'bookTicker':
+                return BinanceBookTicker(d['s'].lower(), d)
+            if e == 'markPriceUpdate':
+                return BinanceMarkPrice(d['s'].lower(), d)
+            if e == 'depthUpdate':
+                return BinanceDepthUpdate(d['s'].lower(), d)
         return None
 
+    def rest_parse_symbol(self, d):
+        f = {x['filterType']: x for x in d['filters']}
+        price, lot = f['PRICE_FILTER'], f['LOT_SIZE']
+        market = f.get('MARKET_LOT_SIZE', lot)
+        band = f.get('PERCENT_PRICE')
+        return SymbolInfo(d['symbol'].lower(),
+            tick_size=price['tickSize'], min_price=price['minPrice'], max_price=price['maxPrice'],
+            step_size=lot['stepSize'], min_size=lot['minQty'], max_size=lot['maxQty'],
+            market_step_size=market['stepSize'], market_min_size=market['minQty'], market_max_size=market['maxQty'],
+            min_notional=f['MIN_NOTIONAL']['notional'] if 'MIN_NOTIONAL' in f else 0,
+            band_up=band['multiplierUp'] if band else None, band_down=band['multiplierDown'] if band else None)
+
+    def rest_parse_balance(self, d):
+        return Balance(
+            asset=d['asset'],
+            time=datetime.fromtimestamp(d['updateTime']/1000),
+            wallet_balance=Decimal(d['walletBalance']),
+            cross_balance=Decimal(d['crossWalletBalance']),
+        )
+
+    def rest_parse_position(self, d):
+        return Position(
+            symbol=d['symbol'].lower(),
+            side=d['positionSide'].lower(),
+            time=datetime.fromtimestamp(d['updateTime']/1000),
+            size=Decimal(d['positionAmt']),
+            entry_price=Decimal(d['entryPrice']),
+            unrealized_pnl=Decimal(d['unrealizedProfit']),
+        )
+
+    def rest_parse_open_order(self, d):
+        total_size = Decimal(d['executedQty'])
+        return OrderUpdate(
+            order=self.get_order(d['clientOrderId'], d['symbol'], d['type'], d['side'], d['origQty'], d['price'],
+                d['stopPrice'], d['reduceOnly'], d['timeInForce']),
+            time=datetime.fromtimestamp(d['updateTime']/1000),
+            status=self.get_order_status(d['status']),
+            size=Decimal(0),
+            total_size=total_size,
+            price=Decimal(d['avgPrice']),
+            average_price=Decimal(d['avgPrice']),
+        )
+
     def uws_parse_message(self, msg):
-        if 'e' in msg and msg['e'] == 'ORDER_TRADE_UPDATE':
+        e = msg.get('e')
+        if e == 'ORDER_TRADE_UPDATE':
             d = msg['o']
-            if d['c'] in self.orders:
-                return OrderUpdate(
-                        order=self.orders[d['c']],
-                        time=datetime.fromtimestamp(msg['T']/1000),
-                        status=self.get_order_status(d['X']),
-                        size=Decimal(d['l']),
-                        total_size=Decimal(d['z']),
-                        price=Decimal(d['L']),
-                        average_price=Decimal(d['ap']),
-                    )
+            return OrderUpdate(
+                    order=self.get_order(d['c'], d['s'], d['o'], d['S'], d['q'], d['p'], d['sp'], d['R'], d['f']),
+                    time=datetime.fromtimestamp(msg['T']/1000),
+                    status=self.get_order_status(d['X']),
+                    size=Decimal(d['l']),
+                    total_size=Decimal(d['z']),
+                    price=Decimal(d['L']),
+                    average_price=Decimal(d['ap']),
+                )
+        if e == 'ACCOUNT_UPDATE':
+            t = datetime.fromtimestamp(msg['T']/1000)
+            d = msg['a']
+            items = [Balance(asset=b['a'], time=t, wallet_balance=Decimal(b['wb']), cross_balance=Decimal(b['cw'])) for b in d['B']]
+            items += [Position(symbol=p['s'].lower(), side=p['ps'].lower(), time=t, size=Decimal(p['pa']),
+                entry_price=Decimal(p['ep']), unrealized_pnl=Decimal(p['up'])) for p in d['P']]
+            return items
         return None
 
     async def mws_open(self, stream):
         log.debug(f'opening market stream {stream}')
         endpoint = self.mws_get_endpoint(stream)
-        await self.mws_connect([endpoint])
-        self.mws_streams[endpoint].add(stream)
+        if self.offline and isinstance(stream, OrderBookStream):
+            raise Exception(f'{stream} needs a depth snapshot and can not be replayed')
+        self.mws_streams[endpoint] = self.mws_streams.get(endpoint, ())+(stream,) # before connecting, not to miss first items
+        if isinstance(stream, OrderBookStream) and endpoint not in self.mws_books:
+            self.mws_books[endpoint] = OrderBook(stream.symbol)
+            self.mws_book_buffers[endpoint] = [] # diffs are held from the moment they arrive
+        try:
+            await self.mws_sync()
+        except Exception:
+            self.mws_streams[endpoint] = tuple(s for s in self.mws_streams[endpoint] if s is not stream)
+            if len(self.mws_streams[endpoint]) == 0:
+                del self.mws_streams[endpoint]
+                if endpoint in self.mws_books and endpoint not in self.mws_book_tasks:
+                    self.mws_books.pop(endpoint)
+                    self.mws_book_buffers.pop(endpoint, None)
+            raise
+        if endpoint in self.mws_book_buffers and endpoint not in self.mws_book_tasks: # snapshot once subscribed
+            self.mws_book_tasks[endpoint] = asyncio.get_event_loop().create_task(self.mws_book_snapshot(endpoint))
 
     async def uws_open(self, stream):
         log.debug(f'opening user stream {stream}')
-        await self.uws_connect()
         self.uws_streams.add(stream)
+        if isinstance(stream, AccountStream):
+            self.uws_account_streams += (stream,)
+        else:
+            order = stream.order
+            self.uws_add_order_stream(stream, None if order is None else order if order.id is None else order.id)
+        await self.uws_connect()
+        if isinstance(stream, AccountStream) and not self.account.loaded and not self.offline:
+            await self.sync_account() # after connecting, so no change falls between snapshot and stream
 
     async def mws_close(self, stream):
         log.debug(f'closing market stream {stream}')
         endpoint = self.mws_get_endpoint(stream)
-        if endpoint not in self.mws_streams:
+        if stream not in self.mws_streams.get(endpoint, ()):
             log.warning(f'{stream} is not open')
             return
-        await self.mws_disconnect([endpoint])
-        self.mws_streams[endpoint].remove(stream)
+        self.mws_streams[endpoint] = tuple(s for s in self.mws_streams[endpoint] if s is not stream)
+        if len(self.mws_streams[endpoint]) == 0:
+            del self.mws_streams[endpoint]
+            if endpoint in self.mws_books:
+                await self.mws_book_drop(endpoint)
+            await self.mws_sync()
 
     async def uws_close(self, stream):
         log.debug(f'closing user stream {stream}')
         if stream not in self.uws_streams:
             log.warning(f'{stream} is not open')
             return
-        await self.uws_disconnect()
         self.uws_streams.remove(stream)
+        if isinstance(stream, AccountStream):
+            self.uws_account_streams = tuple(s for s in self.uws_account_streams if s is not stream)
+        else:
+            self.uws_remove_order_stream(stream)
+        if len(self.uws_streams) == 0: # other streams still need the connection
+            await self.uws_disconnect()
         
-    async def mws_worker(self):
-        log.debug('starting market websocket task')
+    def uws_add_order_stream(self, stream, key):
+        self.uws_order_keys[stream] = key
+        self.uws_order_streams[key] = self.uws_order_streams.get(key, ())+(stream,)
+
+    def uws_remove_order_stream(self, stream):
+        key = self.uws_order_keys.pop(stream)
+        self.uws_order_streams[key] = tuple(s for s in self.uws_order_streams[key] if s is not stream)
+        if len(self.uws_order_streams[key]) == 0:
+            del self.uws_order_streams[key]
+
+    def uws_rekey_order_streams(self, order):
+        # streams opened before submit, or before a resubmit, follow the order to its new id
+        for stream, key in list(self.uws_order_keys.items()):
+            if stream.order is order and key != order.id:
+                self.uws_remove_order_stream(stream)
+                self.uws_add_order_stream(stream, order.id)
+
+    async def mws_worker(self, shard):
+        log.debug(f'starting market websocket task for {shard}')
+        while True:
+            try:
+                msg = await shard.ws.recv()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if shard not in self.mws_shards: # closed by us
+                    break
+                log.warning(f'{shard} connection lost: {e!r}')
+                await self.mws_reconnect(shard)
+                continue
+            if self.recorder is not None:
+                self.recorder.write('m', msg)
+            try:
+                await self.mws_handle(shard, msg)
+            except Exception as e: # one bad frame or tap must not silence the shard
+                log.error(f'{shard} frame dropped: {e!r}', exc_info=True)
+        log.debug(f'market websocket task for {shard} stopped')
+
+    async def mws_handle(self, shard, msg):
+        # parse and dispatch one raw frame, from a socket or a replay
+        j = decoder.loads(msg)
+        item = self.mws_parse_message(j)
+        if item is None:
+            if 'id' in j:
+                self.mws_ack(j)
+        elif isinstance(item, BinanceDepthUpdate):
+            shard.last[j['stream']] = item
+            await self.mws_book_update(j['stream'], item)
+        elif type(item) is list:
+            for d in item:
+                await self.mws_dispatch(j['stream'], d)
+        else:
+            endpoint = j['stream']
+            last = shard.last.get(endpoint)
+            if isinstance(item, Trade) and last is not None and item.id <= last.id:
+                return # already delivered by gap backfill
+            shard.last[endpoint] = item
+            await self.mws_dispatch(endpoint, item)
+
+    async def mws_dispatch(self, endpoint, item):
+        for stream in self.mws_streams.get(endpoint, ()): # snapshot, safe while streams open/close
+            if not stream.write_nowait(item):
+                await stream.write_wait(item) # only a full blocking queue makes us wait
+
+    async def mws_reconnect(self, shard):
+        delay = self.ws_reconnect_delay
+        shard.reconnecting = True
         while True:
+            await asyncio.sleep(random.uniform(0, delay)) # jitter to spread reconnects of many shards
+            log.info(f'reconnecting {shard}')
             try:
-                msg = await self.mws.recv()
-            except ConnectionClosedOK:
+                endpoints = set(shard.endpoints)
+                uri = f'{self.ws_uri}stream?streams=' + '/'.join(endpoints)
+                shard.ws = await websockets.connect(uri)
                 break
-            j = json.loads(msg)
-            item = self.mws_parse_message(j)
-            if item is not None:
-                async with self.ws_lock:
-                    streams = self.mws_streams[j['stream']]
-                    for stream in streams:
-                        if isinstance(stream, CandleStream) and isinstance(item, Candle):
-                            await stream.write(item)
-                        elif isinstance(stream, TradeStream) and isinstance(item, Trade):
-                            await stream.write(item)
-        log.debug('market websocket task stopped')
-        
+            except Exception as e:
+                log.warning(f'reconnecting {shard} failed: {e!r}')
+                delay = min(2*delay, self.ws_reconnect_max_delay)
+        shard.reconnecting = False
+        if shard.endpoints-endpoints: # added while connecting; not awaited here, this task reads the ack
+            asyncio.get_event_loop().create_task(self.mws_resubscribe(shard, list(shard.endpoints-endpoints)))
+        await self.mws_backfill(shard)
+
+    async def mws_resubscribe(self, shard, endpoints):
+        try:
+            await self.mws_send(shard, 'SUBSCRIBE', endpoints)
+        except Exception as e:
+            log.warning(f'subscribing {endpoints} on {shard} failed: {e!r}')
+
+    async def mws_backfill(self, shard):
+        for endpoint, last in list(shard.last.items()):
+            if endpoint not in shard.endpoints:
+                shard.last.pop(endpoint)
+                continue
+            try:
+                if isinstance(last, Candle):
+                    start = last.open_time+timeframe_delta(last.timeframe) if last.closed else last.open_time # a closed bar was delivered in full
+                    if start > datetime.now():
+                        continue
+                    count = int((datetime.now()-start)/timeframe_delta(last.timeframe))+1
+                    log.info(f'backfilling {count} candles of {endpoint}')
+                    async for c in self.iter_candle_history(last.symbol, last.timeframe, start, min(count, self.ws_backfill_limit)):
+                        shard.last[endpoint] = c
+                        await self.mws_dispatch(endpoint, c)
+                elif isinstance(last, Trade):
+                    log.info(f'backfilling trades of {endpoint} from id {last.id+1}')
+                    async for t in self.iter_trade_history(last.symbol, None, self.ws_backfill_limit, start_id=last.id+1):
+                        shard.last[endpoint] = t
+                        await self.mws_dispatch(endpoint, t)
+                elif isinstance(last, BinanceDepthUpdate) and endpoint in self.mws_books:
+                    self.mws_book_resync(endpoint) # missed diffs can not be fetched, reload the book
+            except Exception as e:
+                log.warning(f'backfilling {endpoint} failed: {e!r}')
+
+    async def mws_book_update(self, endpoint, u):
+        book = self.mws_books.get(endpoint)
+        if book is None:
+            return
+        buffer = self.mws_book_buffers.get(endpoint)
+        if buffer is not None: # snapshot loading
+            buffer.append(u)
+            return
+        first = endpoint in self.mws_book_fresh
+        if first and u.last_id < book.update_id:
+            return # already in the snapshot
+        if not self.mws_book_apply(book, u, first):
+            log.warning(f'gap in {endpoint} before update {u.first_id}, reloading book')
+            self.mws_book_resync(endpoint, [u])
+            return
+        self.mws_book_fresh.discard(endpoint)
+        await self.mws_dispatch(endpoint, book)
+
+    def mws_book_apply(self, book, u, first):
+        # the first diff after a snapshot must straddle its id, later ones chain by previous id
+        if first:
+            if not u.first_id <= book.update_id <= u.last_id:
+                return False
+        elif u.prev_id != book.update_id:
+            return False
+        book.apply(u.bids, u.asks)
+        book.update_id = u.last_id
+        book.time = u.time
+        return True
+
+    def mws_book_resync(self, endpoint, buffer=None):
+        if endpoint in self.mws_book_buffers:
+            return # already loading
+        self.mws_books[endpoint].synced = False
+        self.mws_book_fresh.discard(endpoint)
+        self.mws_book_buffers[endpoint] = buffer or []
+        self.mws_book_tasks[endpoint] = asyncio.get_event_loop().create_task(self.mws_book_snapshot(endpoint))
+
+    async def mws_book_snapshot(self, endpoint):
+        book = self.mws_books[endpoint]
+        delay = self.ws_reconnect_delay
+        while True:
+            try:
+                params = {'symbol': book.symbol.upper(), 'limit': self.mws_book_limit}
+                j = await self.request('depth', params=params)
+            except Exception as e:
+                log.warning(f'loading {endpoint} snapshot failed: {e!r}')
+            else:
+                # nothing awaits from here on, so the buffer can not change under us
+                book.load(j['bids'], j['asks'], j['lastUpdateId'])
+                buffer = self.mws_book_buffers[endpoint]
+                first = True
+                for i, u in enumerate(buffer):
+                    if first and u.last_id < book.update_id:
+                        continue
+                    if not self.mws_book_apply(book, u, first):
+                        break
+                    first = False
+                else:
+                    break
+                log.warning(f'{endpoint} snapshot {book.update_id} does not join update {u.first_id}, retrying')
+                self.mws_book_buffers[endpoint] = buffer[i:] # the next snapshot must reach past the gap
+            await asyncio.sleep(delay)
+            delay = min(2*delay, self.ws_reconnect_max_delay)
+        del self.mws_book_buffers[endpoint]
+        del self.mws_book_tasks[endpoint]
+        if first:
+            self.mws_book_fresh.add(endpoint)
+        book.synced = True
+        log.debug(f'{book} loaded')
+        await self.mws_dispatch(endpoint, book)
+
+    async def mws_book_drop(self, endpoint):
+        task = self.mws_book_tasks.pop(endpoint, None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.mws_books.pop(endpoint)
+        self.mws_book_buffers.pop(endpoint, None)
+        self.mws_book_fresh.discard(endpoint)
+
     async def uws_worker(self):
         log.debug('starting user websocket task')
         keepalive_task = asyncio.get_event_loop().create_task(self.uws_keepalive_worker())
+        try:
+            while True:
+                try:
+                    msg = await self.uws.recv()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if not self.uws_connected: # closed by us
+                        break
+                    log.warning(f'user websocket connection lost: {e!r}')
+                    await self.uws_reconnect()
+                    continue
+                if self.recorder is not None:
+                    self.recorder.write('u', msg)
+                try:
+                    await self.uws_handle(msg)
+                except Exception as e:
+                    log.error(f'user websocket frame dropped: {e!r}', exc_info=True)
+        finally:
+            keepalive_task.cancel()
+        log.debug('user websocket task stopped')
+
+    async def uws_handle(self, msg):
+        item = self.uws_parse_message(decoder.loads(msg))
+        if type(item) is list:
+            for d in item:
+                await self.uws_dispatch(d)
+        elif item is not None:
+            await self.uws_dispatch(item)
+
+    async def replay(self, source):
+        # feed recorded frames through the live parse and dispatch path; returns the frame count
+        log.info(f'starting {source}')
+        shard = WebsocketShard('replay')
+        n = 0
+        async for channel, msg in source:
+            try:
+                if channel == 'm':
+                    await self.mws_handle(shard, msg)
+                elif channel == 'u':
+                    await self.uws_handle(msg)
+            except Exception as e: # as the live workers do
+                log.error(f'replayed frame dropped: {e!r}', exc_info=True)
+            n += 1
+        log.info(f'finished {source}')
+        return n
+
+    async def uws_dispatch(self, item):
+        if isinstance(item, OrderUpdate):
+            streams = self.uws_order_streams.get(item.order.id, ())+self.uws_order_streams.get(None, ())
+            self.order_updates[item.order.id] = item
+            if item.status in ['fill', 'cancel', 'expire']:
+                self.orders.pop(item.order.id, None)
+                self.order_updates.pop(item.order.id, None)
+            for stream in streams:
+                if not stream.write_nowait(item):
+                    await stream.write_wait(item)
+        if self.account.update(item):
+            await self.uws_notify(item)
+
+    async def uws_notify(self, item):
+        for stream in self.uws_account_streams:
+            if not stream.write_nowait(item):
+                await stream.write_wait(item)
+
+    async def uws_reconnect(self):
+        delay = self.ws_reconnect_delay
         while True:
+            await asyncio.sleep(random.uniform(0, delay))
+            log.info('reconnecting user websocket')
             try:
-                msg = await self.uws.recv()
-            except ConnectionClosedOK:
+                listen_key = await self.uws_create_key()
+                self.uws = await websockets.connect(f'{self.ws_uri}ws/{listen_key}')
                 break
-            async with self.ws_lock:
-                item = self.uws_parse_message(json.loads(msg))
-                if item is not None:
-                    for stream in self.uws_streams:
-                        if isinstance(stream, OrderUpdateStream) and isinstance(item, OrderUpdate) and stream.order.id==item.order.id:
-                            await stream.write(item)
-                            if item.status in ['fill', 'cancel', 'expire']:
-                                self.orders.pop(item.order.id)
-        keepalive_task.cancel()
-        log.debug('user websocket task stopped')
+            except Exception as e:
+                log.warning(f'reconnecting user websocket failed: {e!r}')
+                delay = min(2*delay, self.ws_reconnect_max_delay)
+        await self.uws_backfill()
+
+    async def uws_backfill(self):
+        # order updates have no history endpoint: query each tracked order and report what changed
+        for order in list(self.orders.values()):
+            try:
+                params = {'symbol': order.symbol.upper(), 'origClientOrderId': order.id}
+                j = await self.request('order', params=params, sign=True)
+            except Exception as e:
+                log.warning(f'backfilling {order} failed: {e!r}')
+                continue
+            last = self.order_updates.get(order.id)
+            status = self.get_order_status(j['status'])
+            total_size = Decimal(j['executedQty'])
+            if last is not None and last.status == status and last.total_size == total_size:
+                continue
+            item = OrderUpdate(
+                    order=order,
+                    time=datetime.fromtimestamp(j['updateTime']/1000),
+                    status=status,
+                    size=total_size-(last.total_size if last is not None else 0),
+                    total_size=total_size,
+                    price=Decimal(j['avgPrice']),
+                    average_price=Decimal(j['avgPrice']),
+                )
+            await self.uws_dispatch(item)
+        if self.account.loaded:
+            try:
+                await self.sync_account() # balances and positions may have moved too
+            except Exception as e:
+                log.warning(f'syncing account failed: {e!r}')
 
     async def uws_keepalive_worker(self):
         log.debug('starting user websocket keepalive task')
@@ -417,6 +1259,39 @@ class BinanceFutures(Exchange):
         log.debug('refreshing user websocket listen key')
         await self.request('listenKey', method='PUT', sign=True)
 
+    def rest_get_weight(self, endpoint, method, params):
+        # (request weight, order count) as documented per endpoint
+        limit = params.get('limit', 500)
+        if endpoint == 'klines':
+            if limit < 100:
+                return 1, 0
+            elif limit < 500:
+                return 2, 0
+            elif limit <= 1000:
+                return 5, 0
+            return 10, 0
+        if endpoint == 'aggTrades':
+            return 20, 0
+        if endpoint == 'depth':
+            if limit <= 50:
+                return 2, 0
+            elif limit <= 100:
+                return 5, 0
+            elif limit <= 500:
+                return 10, 0
+            return 20, 0
+        if endpoint == 'order':
+            return 1, 1 if method == 'POST' else 0
+        if endpoint == 'account':
+            return 5, 0
+        if endpoint == 'openOrders':
+            return 1 if 'symbol' in params else 40, 0
+        if endpoint == 'batchOrders':
+            if method == 'POST':
+                return 5, len(json.loads(params['batchOrders']))
+            return 1, 0
+        return 1, 0
+
     async def ws_rate_limit(self, t0):
         t = 0.1-(time.time()-t0)
         if t>0:
@@ -452,6 +1327,62 @@ class BinanceFutures(Exchange):
         #log.info(f'params:\n{params}')
         return params
 
+    def check_order(self, order):
+        # raises when the symbol rules reject the order; skipped before open() loads them
+        if len(self.symbols) == 0:
+            return
+        symbol = order.symbol.lower() # sent upper cased, so either case is valid
+        info = self.symbols.get(symbol)
+        if info is None:
+            raise Exception(f'invalid order {order}: unknown symbol')
+        error = info.validate(order, self.get_mark_price(symbol))
+        if error is not None:
+            raise Exception(f'invalid order {order}: {error}')
+
+    def get_mark_price(self, symbol):
+        # from an open mark price stream, if any
+        for endpoint in (f'{symbol}@markPrice@1s', f'{symbol}@markPrice', '!markPrice@arr@1s', '!markPrice@arr'):
+            for stream in self.mws_streams.get(endpoint, ()):
+                item = stream.latest.get(symbol)
+                if item is not None:
+                    return item.price
+        return None
+
+    def track_order(self, order):
+        self.orders[order.id] = order
+        self.uws_rekey_order_streams(order)
+        if len(self.orders) > self.max_orders:
+            # orders that never reached a final status, e.g. ones that finished while nobody was listening
+            for id in list(self.orders):
+                if len(self.orders) <= self.max_orders:
+                    break
+                if id not in self.account.open_orders:
+                    self.orders.pop(id)
+                    self.order_updates.pop(id, None)
+
+    def get_order(self, id, symbol, type, side, size, price, stop_price, reduce_only, time_in_force):
+        # orders placed elsewhere are rebuilt from their exchange fields
+        if id in self.orders:
+            return self.orders[id]
+        if id in self.account.open_orders:
+            return self.account.open_orders[id].order
+        stop_price = Decimal(stop_price) if Decimal(stop_price) != 0 else None
+        price = Decimal(price) if Decimal(price) != 0 else None
+        types = {'LIMIT': 'limit', 'STOP': 'limit', 'MARKET': 'market', 'STOP_MARKET': 'market'}
+        return Order(symbol=symbol.lower(), type=types.get(type, type.lower()), side=side.lower(), size=Decimal(size),
+            price=price, stop_price=stop_price, reduce_only=reduce_only, post_only=time_in_force == 'GTX', id=id)
+
+    def get_json_order_params(self, order):
+        # for batch entries and the websocket api, where binance expects every value as a string
+        params = self.get_order_params(order)
+        return {k: ('true' if v else 'false') if isinstance(v, bool) else str(v) for k, v in params.items()}
+
+    def get_batch_error(self, d):
+        # a batch response holds, per entry, the order or an error
+        if 'code' in d and 'orderId' not in d:
+            return Exception(f'binance error {d["code"]}: {d.get("msg")}')
+        return None
+
     def get_order_status(self, s):
         if s == 'NEW':
             return 'submit'
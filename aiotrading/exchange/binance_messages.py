@@ -0,0 +1,97 @@
+from datetime import datetime
+from decimal import Decimal
+from .. import Candle, Trade, BookTicker, MarkPrice
+
+# models built from raw websocket payloads: fields are converted to
+# Decimal/datetime on first access and then cached in the model slot
+
+def lazy_field(cls, name, key, convert):
+    slot = cls.__dict__[name]
+    def get(self):
+        try:
+            return slot.__get__(self, cls)
+        except AttributeError:
+            v = convert(self.raw[key])
+            slot.__set__(self, v)
+            return v
+    def set(self, v):
+        slot.__set__(self, v)
+    return property(get, set)
+
+def to_datetime(t):
+    return datetime.fromtimestamp(t/1000)
+
+class BinanceCandle(Candle):
+
+    __slots__ = ('raw',)
+
+    def __init__(self, symbol, raw):
+        self.symbol = symbol
+        self.timeframe = raw['i']
+        self.trades = int(raw['n'])
+        self.closed = raw['x']
+        self.raw = raw
+
+    open_time = lazy_field(Candle, 'open_time', 't', to_datetime)
+    update_time = lazy_field(Candle, 'update_time', 'T', to_datetime)
+    open = lazy_field(Candle, 'open', 'o', Decimal)
+    high = lazy_field(Candle, 'high', 'h', Decimal)
+    low = lazy_field(Candle, 'low', 'l', Decimal)
+    close = lazy_field(Candle, 'close', 'c', Decimal)
+    volume = lazy_field(Candle, 'volume', 'v', Decimal)
+    buy_volume = lazy_field(Candle, 'buy_volume', 'V', Decimal)
+
+class BinanceBookTicker(BookTicker):
+
+    __slots__ = ('raw',)
+
+    def __init__(self, symbol, raw):
+        self.symbol = symbol
+        self.raw = raw
+
+    time = lazy_field(BookTicker, 'time', 'T', to_datetime)
+    bid = lazy_field(BookTicker, 'bid', 'b', Decimal)
+    bid_size = lazy_field(BookTicker, 'bid_size', 'B', Decimal)
+    ask = lazy_field(BookTicker, 'ask', 'a', Decimal)
+    ask_size = lazy_field(BookTicker, 'ask_size', 'A', Decimal)
+
+class BinanceMarkPrice(MarkPrice):
+
+    __slots__ = ('raw',)
+
+    def __init__(self, symbol, raw):
+        self.symbol = symbol
+        self.raw = raw
+
+    time = lazy_field(MarkPrice, 'time', 'E', to_datetime)
+    price = lazy_field(MarkPrice, 'price', 'p', Decimal)
+    index_price = lazy_field(MarkPrice, 'index_price', 'i', Decimal)
+    funding_rate = lazy_field(MarkPrice, 'funding_rate', 'r', Decimal)
+    funding_time = lazy_field(MarkPrice, 'funding_time', 'T', to_datetime)
+
+class BinanceDepthUpdate: # a diff of the order book, levels stay raw for the book to parse
+
+    __slots__ = ('symbol', 'time', 'first_id', 'last_id', 'prev_id', 'bids', 'asks')
+
+    def __init__(self, symbol, raw):
+        self.symbol = symbol
+        self.time = raw['E']
+        self.first_id = raw['U']
+        self.last_id = raw['u']
+        self.prev_id = raw['pu']
+        self.bids = raw['b']
+        self.asks = raw['a']
+
+class BinanceTrade(Trade):
+
+    __slots__ = ('raw',)
+
+    def __init__(self, symbol, raw):
+        self.symbol = symbol
+        self.id = raw['a']
+        self.buy = raw['m']
+        self.raw = raw
+
+    time = lazy_field(Trade, 'time', 'T', to_datetime)
+    price = lazy_field(Trade, 'price', 'p', Decimal)
+    volume = lazy_field(Trade, 'volume', 'q', Decimal)
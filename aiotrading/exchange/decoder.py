@@ -0,0 +1,15 @@
+import json
+
+# fastest available json backend, stdlib as fallback
+try:
+    import orjson
+    backend = 'orjson'
+    loads = orjson.loads
+except ImportError:
+    try:
+        import msgspec
+        backend = 'msgspec'
+        loads = msgspec.json.Decoder().decode
+    except ImportError:
+        backend = 'json'
+        loads = json.loads
@@ -13,17 +13,45 @@ class Exchange: # abstract exchange (minimum portable) api
     async def close(self):
         log.warning('close: not implemented')
 
-    async def candle_history(self, symbol, timeframe, start_time, count):
+    async def candle_history(self, symbol, timeframe, start_time, count, frame=False):
         log.error('candle_history: not implemented')
 
-    async def trade_history(self, symbol, start_time, count, start_id=None):
+    async def trade_history(self, symbol, start_time, count, start_id=None, frame=False):
         log.error('trade_history: not implemented')
     
+    async def iter_candle_history(self, symbol, timeframe, start_time, count, pages=False, prefetch=2):
+        log.error('iter_candle_history: not implemented')
+        return
+        yield
+
+    async def iter_trade_history(self, symbol, start_time, count, start_id=None, pages=False, prefetch=2):
+        log.error('iter_trade_history: not implemented')
+        return
+        yield
+
+    async def candle_backfill(self, symbols, timeframe, start_time, end_time, concurrency=10):
+        log.error('candle_backfill: not implemented')
+
+    async def trade_backfill(self, symbols, start_time, end_time, concurrency=10):
+        log.error('trade_backfill: not implemented')
+
+    async def sync_account(self):
+        log.error('sync_account: not implemented')
+
     async def submit_order(self, order):
         log.error('submit_order: not implemented')
     
     async def cancel_order(self, order):
         log.error('cancel_order: not implemented')
+
+    async def submit_orders(self, orders, concurrency=10):
+        log.error('submit_orders: not implemented')
+
+    async def cancel_orders(self, orders, concurrency=10):
+        log.error('cancel_orders: not implemented')
+
+    async def cancel_all_orders(self, symbol):
+        log.error('cancel_all_orders: not implemented')
     
     async def open_stream(self, stream):
         log.error('open_stream: not implemented')
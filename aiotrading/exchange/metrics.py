@@ -0,0 +1,29 @@
+class LatencyStats:
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def add(self, t):
+        self.count += 1
+        self.total += t
+        self.last = t
+        if self.min is None or t < self.min:
+            self.min = t
+        if self.max is None or t > self.max:
+            self.max = t
+
+    @property
+    def mean(self):
+        return self.total/self.count if self.count > 0 else None
+
+    def __str__(self):
+        if self.count == 0:
+            return 'latency n:0'
+        return f'latency n:{self.count}, mean:{self.mean*1000:.1f}ms, min:{self.min*1000:.1f}ms, max:{self.max*1000:.1f}ms, last:{self.last*1000:.1f}ms'
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,72 @@
+import asyncio
+import time
+import logging
+
+log = logging.getLogger('aiotrading')
+
+class RateBucket: # token bucket refilled continuously at limit/period per second
+
+    def __init__(self, name, kind, limit, period):
+        self.name = name
+        self.kind = kind # weight, orders
+        self.limit = limit
+        self.period = period
+        self.tokens = limit
+        self.t = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        t = time.monotonic()
+        self.tokens = min(self.limit, self.tokens + (t-self.t)*self.limit/self.period)
+        self.t = t
+
+    async def acquire(self, cost):
+        if cost <= 0:
+            return
+        cost = min(cost, self.limit)
+        async with self.lock: # waiters are served in arrival order
+            while True:
+                self.refill()
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                wait = (cost-self.tokens)*self.period/self.limit
+                log.debug(f'{self.name} limit: {self.limit}, tokens: {self.tokens:.1f}, cost: {cost}, wait: {wait:.3f}')
+                await asyncio.sleep(wait)
+
+    def sync(self, used): # server reported usage in current window
+        self.refill()
+        self.tokens = min(self.tokens, self.limit-used)
+
+    def __str__(self):
+        return f'{self.name}: {self.limit}/{self.period}s'
+
+    def __repr__(self):
+        return self.__str__()
+
+class RateLimiter:
+
+    def __init__(self):
+        self.buckets = {}
+
+    def add(self, name, kind, limit, period):
+        self.buckets[name] = RateBucket(name, kind, limit, period)
+
+    async def acquire(self, weight=1, orders=0):
+        costs = {'weight': weight, 'orders': orders}
+        for bucket in self.buckets.values():
+            await bucket.acquire(costs.get(bucket.kind, 0))
+
+    def update(self, headers):
+        for name, bucket in self.buckets.items():
+            if name in headers:
+                bucket.sync(float(headers[name]))
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def __str__(self):
+        return ', '.join([str(b) for b in self.buckets.values()])
+
+    def __repr__(self):
+        return self.__str__()
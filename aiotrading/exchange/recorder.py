@@ -0,0 +1,102 @@
+import logging
+import asyncio
+import gzip
+import os
+import time
+from datetime import datetime
+
+log = logging.getLogger('aiotrading')
+
+# raw websocket frames on disk, one line per frame: receive time, channel and the
+# frame text as it came off the socket. channel is m for market and u for user
+# websockets. files are gzip and only ever appended to, so a crash loses at most
+# the unflushed tail, and are rotated by size and age.
+
+class FrameRecorder:
+
+    def __init__(self, path, max_bytes=256*2**20, max_age=3600, level=1):
+        self.path = path # directory of the recording
+        self.max_bytes = max_bytes # uncompressed bytes per file
+        self.max_age = max_age # seconds per file
+        self.level = level # gzip level, low to keep up with the sockets
+        self.file = None
+        self.file_path = None
+        self.file_bytes = 0
+        self.file_time = 0
+        self.frames = 0
+
+    def open(self):
+        log.info(f'opening {self}')
+        os.makedirs(self.path, exist_ok=True)
+
+    def close(self):
+        if self.file is not None:
+            log.info(f'closing {self}')
+            self.file.close()
+            self.file = None
+
+    def rotate(self, t):
+        self.close()
+        self.file_path = os.path.join(self.path, f'frames-{datetime.fromtimestamp(t):%Y%m%d-%H%M%S-%f}.gz')
+        self.file = gzip.open(self.file_path, 'ab', compresslevel=self.level)
+        self.file_bytes = 0
+        self.file_time = t
+
+    def write(self, channel, msg, t=None):
+        t = time.time() if t is None else t
+        if type(msg) is str:
+            msg = msg.encode()
+        if self.file is None or self.file_bytes >= self.max_bytes or t-self.file_time >= self.max_age:
+            self.rotate(t)
+        line = b'%.6f %s %s\n' % (t, channel.encode(), msg)
+        self.file.write(line)
+        self.file_bytes += len(line)
+        self.frames += 1
+
+    def __str__(self):
+        return f'frame recorder {self.path}, file:{self.file_path}, frames:{self.frames}'
+
+    def __repr__(self):
+        return self.__str__()
+
+class FrameReplay: # recorded frames in order, paced by their receive times
+
+    def __init__(self, path, speed=1.0, batch=100):
+        self.path = path # a recording directory, a file or a list of files
+        self.speed = speed # 1 for original pacing, n for n times faster, None for as fast as possible
+        self.batch = batch # frames between yields to the readers when not paced
+        self.frames = 0
+
+    def files(self):
+        if isinstance(self.path, (list, tuple)):
+            return list(self.path)
+        if os.path.isdir(self.path):
+            return [os.path.join(self.path, f) for f in sorted(os.listdir(self.path)) if f.endswith('.gz')]
+        return [self.path]
+
+    async def __aiter__(self):
+        t0 = w0 = None
+        for path in self.files():
+            log.info(f'replaying {path}')
+            with gzip.open(path, 'rb') as f:
+                try:
+                    for line in f:
+                        t, channel, msg = line.rstrip(b'\n').split(b' ', 2)
+                        if self.speed:
+                            t = float(t)
+                            if t0 is None:
+                                t0, w0 = t, time.monotonic()
+                            wait = w0+(t-t0)/self.speed-time.monotonic()
+                            await asyncio.sleep(wait if wait > 0 else 0)
+                        elif self.frames%self.batch == 0:
+                            await asyncio.sleep(0) # let readers keep up
+                        self.frames += 1
+                        yield channel.decode(), msg
+                except (EOFError, gzip.BadGzipFile) as e:
+                    log.warning(f'{path} is truncated: {e!r}') # recorder did not close it
+
+    def __str__(self):
+        return f'frame replay {self.path}, speed:{self.speed}, frames:{self.frames}'
+
+    def __repr__(self):
+        return self.__str__()
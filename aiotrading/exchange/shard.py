@@ -0,0 +1,19 @@
+class WebsocketShard: # one market websocket connection and the endpoints multiplexed on it
+
+    def __init__(self, id):
+        self.id = id
+        self.ws = None
+        self.task = None
+        self.endpoints = set()
+        self.last = {} # last item received per endpoint
+        self.send_time = 0
+        self.reconnecting = False # endpoints added meanwhile are part of the reconnect uri
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def __str__(self):
+        return f'websocket shard {self.id} ({len(self.endpoints)} streams)'
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,228 @@
+import time
+from datetime import datetime
+from decimal import Decimal
+from .candle import Candle
+from .trade import Trade
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# columnar containers: times are int64 epoch milliseconds, prices and volumes float64
+
+class Frame:
+
+    columns = {}
+
+    def __init__(self, capacity=0, **data):
+        if np is None:
+            raise Exception(f'{type(self).__name__} requires numpy')
+        if len(data) > 0:
+            self.data = {k: np.asarray(data[k], dtype=t) for k, t in self.columns.items()}
+            self.size = len(self.data[next(iter(self.columns))])
+        else:
+            self.data = {k: np.empty(capacity, dtype=t) for k, t in self.columns.items()}
+            self.size = 0
+
+    def __getattr__(self, name):
+        columns = type(self).columns
+        if name in columns:
+            return self.__dict__['data'][name][:self.__dict__['size']]
+        raise AttributeError(name)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.view(**{k: v[:self.size][i] for k, v in self.data.items()}) # numpy basic slices share memory
+        if i < 0:
+            i += self.size
+        if i < 0 or i >= self.size:
+            raise IndexError(i)
+        return self.row(i)
+
+    def __iter__(self):
+        for i in range(self.size):
+            yield self.row(i)
+
+    def reserve(self, n):
+        capacity = len(self.data[next(iter(self.columns))])
+        if self.size+n > capacity:
+            capacity = max(self.size+n, 2*capacity, 16)
+            for k, v in self.data.items():
+                a = np.empty(capacity, dtype=v.dtype)
+                a[:self.size] = v[:self.size]
+                self.data[k] = a
+
+    def append_columns(self, **data):
+        n = len(data[next(iter(self.columns))])
+        self.reserve(n)
+        for k in self.columns:
+            self.data[k][self.size:self.size+n] = data[k]
+        self.size += n
+
+    def extend(self, frame):
+        self.append_columns(**{k: getattr(frame, k) for k in self.columns})
+
+    def __repr__(self):
+        return self.__str__()
+
+class CandleFrame(Frame):
+
+    columns = {
+        'open_time': 'int64',
+        'update_time': 'int64',
+        'open': 'float64',
+        'high': 'float64',
+        'low': 'float64',
+        'close': 'float64',
+        'volume': 'float64',
+        'buy_volume': 'float64',
+        'trades': 'int64',
+        'closed': 'bool',
+    }
+
+    def __init__(self, symbol, timeframe, capacity=0, **data):
+        super().__init__(capacity, **data)
+        self.symbol = symbol
+        self.timeframe = timeframe
+
+    def view(self, **data):
+        return CandleFrame(self.symbol, self.timeframe, **data)
+
+    @classmethod
+    def from_candles(cls, symbol, timeframe, candles):
+        frame = cls(symbol, timeframe, capacity=len(candles))
+        for c in candles:
+            frame.append(c)
+        return frame
+
+    @classmethod
+    def from_klines(cls, symbol, timeframe, rows):
+        frame = cls(symbol, timeframe)
+        frame.append_klines(rows)
+        return frame
+
+    def append(self, c):
+        self.reserve(1)
+        i = self.size
+        self.data['open_time'][i] = int(c.open_time.timestamp()*1000)
+        self.data['update_time'][i] = int(c.update_time.timestamp()*1000)
+        self.data['open'][i] = c.open
+        self.data['high'][i] = c.high
+        self.data['low'][i] = c.low
+        self.data['close'][i] = c.close
+        self.data['volume'][i] = c.volume
+        self.data['buy_volume'][i] = c.buy_volume
+        self.data['trades'][i] = c.trades
+        self.data['closed'][i] = c.closed
+        self.size += 1
+
+    def append_klines(self, rows): # raw rest kline rows, no per row objects
+        if len(rows) == 0:
+            return
+        a = np.array(rows, dtype=object)
+        update_time = a[:, 6].astype('int64')
+        self.append_columns(
+            open_time=a[:, 0].astype('int64'),
+            update_time=update_time,
+            open=a[:, 1].astype('float64'),
+            high=a[:, 2].astype('float64'),
+            low=a[:, 3].astype('float64'),
+            close=a[:, 4].astype('float64'),
+            volume=a[:, 5].astype('float64'),
+            buy_volume=a[:, 9].astype('float64'),
+            trades=a[:, 8].astype('int64'),
+            closed=update_time < time.time()*1000, # the last row may be the open bar
+        )
+
+    def row(self, i):
+        d = self.data
+        return Candle(
+            symbol=self.symbol,
+            timeframe=self.timeframe,
+            open_time=datetime.fromtimestamp(d['open_time'][i]/1000),
+            update_time=datetime.fromtimestamp(d['update_time'][i]/1000),
+            open=Decimal(repr(float(d['open'][i]))),
+            high=Decimal(repr(float(d['high'][i]))),
+            low=Decimal(repr(float(d['low'][i]))),
+            close=Decimal(repr(float(d['close'][i]))),
+            volume=Decimal(repr(float(d['volume'][i]))),
+            buy_volume=Decimal(repr(float(d['buy_volume'][i]))),
+            trades=int(d['trades'][i]),
+            closed=bool(d['closed'][i]))
+
+    def to_candles(self):
+        return list(self)
+
+    def __str__(self):
+        return f'candle frame {self.symbol}, {self.timeframe}, length:{self.size}'
+
+class TradeFrame(Frame):
+
+    columns = {
+        'id': 'int64',
+        'time': 'int64',
+        'price': 'float64',
+        'volume': 'float64',
+        'buy': 'bool',
+    }
+
+    def __init__(self, symbol, capacity=0, **data):
+        super().__init__(capacity, **data)
+        self.symbol = symbol
+
+    def view(self, **data):
+        return TradeFrame(self.symbol, **data)
+
+    @classmethod
+    def from_trades(cls, symbol, trades):
+        frame = cls(symbol, capacity=len(trades))
+        for t in trades:
+            frame.append(t)
+        return frame
+
+    @classmethod
+    def from_agg_trades(cls, symbol, rows):
+        frame = cls(symbol)
+        frame.append_agg_trades(rows)
+        return frame
+
+    def append(self, t):
+        self.reserve(1)
+        i = self.size
+        self.data['id'][i] = t.id
+        self.data['time'][i] = int(t.time.timestamp()*1000)
+        self.data['price'][i] = t.price
+        self.data['volume'][i] = t.volume
+        self.data['buy'][i] = t.buy
+        self.size += 1
+
+    def append_agg_trades(self, rows): # raw rest aggTrade rows, no per row objects
+        if len(rows) == 0:
+            return
+        self.append_columns(
+            id=np.fromiter((d['a'] for d in rows), dtype='int64', count=len(rows)),
+            time=np.fromiter((d['T'] for d in rows), dtype='int64', count=len(rows)),
+            price=np.array([d['p'] for d in rows]).astype('float64'),
+            volume=np.array([d['q'] for d in rows]).astype('float64'),
+            buy=np.fromiter((d['m'] for d in rows), dtype='bool', count=len(rows)),
+        )
+
+    def row(self, i):
+        d = self.data
+        return Trade(
+            symbol=self.symbol,
+            id=int(d['id'][i]),
+            time=datetime.fromtimestamp(d['time'][i]/1000),
+            price=Decimal(repr(float(d['price'][i]))),
+            volume=Decimal(repr(float(d['volume'][i]))),
+            buy=bool(d['buy'][i]))
+
+    def to_trades(self):
+        return list(self)
+
+    def __str__(self):
+        return f'trade frame {self.symbol}, length:{self.size}'
@@ -0,0 +1,347 @@
+import math
+from collections import deque
+from datetime import datetime
+from .frame import CandleFrame, np
+from .timeframe import timeframe_floor_ms
+
+# incremental indicators over candles. the committed state only ever folds in
+# closed bars; an update of the open bar is computed from that state without
+# changing it, so rolling back a provisional value is free and every update is
+# O(1). frames take a vectorized path, meant for warming up from candle_history.
+# attached to a stream, an indicator sees items as they are written, so it can
+# be ahead of a reader that has a backlog.
+
+def ewm(x, alpha, y=None):
+    # y[i] = y[i-1]+alpha*(x[i]-y[i-1]) starting from y, or from x[0] when y is None;
+    # closed form over chunks short enough for beta**-n to stay finite
+    out = np.empty(len(x))
+    if len(x) == 0:
+        return out
+    if y is None:
+        y = x[0]
+    beta = 1-alpha
+    if beta <= 0:
+        out[:] = x
+        return out
+    n = max(1, int(100/-math.log10(beta)))
+    w = beta**np.arange(1, min(n, len(x))+1)
+    for s in range(0, len(x), n):
+        c = x[s:s+n]
+        wk = w[:len(c)]
+        out[s:s+len(c)] = wk*(y+np.cumsum(alpha*c/wk))
+        y = out[s+len(c)-1]
+    return out
+
+def rolling_sum(x, n):
+    # sums of n consecutive values, for the windows ending at x[n-1:]
+    c = np.concatenate(([0.0], np.cumsum(x)))
+    return c[n:]-c[:-n]
+
+def to_value(v):
+    return None if math.isnan(v) else float(v)
+
+class Indicator: # subclasses define step(c, commit), the value after c, folded into the state only when commit is true
+
+    def __init__(self, stream=None):
+        self.value = None
+        self.last = None # open time of the last committed bar
+        self.pending = None # latest update of the open bar, not committed
+        self.stream = None
+        if stream is not None:
+            self.attach(stream)
+
+    def attach(self, stream):
+        self.stream = stream
+        stream.tap(self)
+
+    def detach(self):
+        self.stream.untap(self)
+        self.stream = None
+
+    def update(self, c):
+        if self.last is not None and c.open_time <= self.last:
+            return self.value # stale, or a repeated final update
+        if self.pending is not None and c.open_time != self.pending.open_time:
+            self.step(self.pending, True) # the final update of that bar never came
+            self.last = self.pending.open_time
+        self.pending = None if c.closed else c
+        if c.closed:
+            self.last = c.open_time
+        self.value = self.step(c, c.closed)
+        return self.value
+
+    def extend(self, candles):
+        # warm up from history, a list of candles or a CandleFrame
+        if not isinstance(candles, CandleFrame):
+            for c in candles:
+                self.update(c)
+            return self.value
+        frame = candles
+        if self.last is not None:
+            frame = frame[int(np.searchsorted(frame.open_time, int(self.last.timestamp()*1000), 'right')):]
+        k = len(frame) if len(frame) == 0 or frame.closed[-1] else len(frame)-1
+        if k > 0:
+            if self.pending is not None:
+                if int(self.pending.open_time.timestamp()*1000) < frame.open_time[0]:
+                    self.step(self.pending, True)
+                self.pending = None # otherwise history supersedes it
+            self.batch(frame[:k])
+            self.last = datetime.fromtimestamp(frame.open_time[k-1]/1000)
+        for c in frame[k:]:
+            self.update(c)
+        return self.value
+
+    def batch(self, frame):
+        # fold closed rows of a frame into the state, row by row unless a subclass vectorizes it
+        out = [self.step(c, True) for c in frame]
+        if out:
+            self.value = out[-1]
+        return out
+
+    def __repr__(self):
+        return self.__str__()
+
+class SMA(Indicator):
+
+    def __init__(self, n, source='close', stream=None):
+        self.n = n
+        self.source = source
+        self.window = deque(maxlen=n)
+        self.sum = 0.0
+        self.commits = 0
+        super().__init__(stream)
+
+    def push(self, x):
+        # running sums drift, so they are refreshed once per window length
+        self.commits += 1
+        self.window.append(x)
+        if self.commits%self.n == 0:
+            self.sum = math.fsum(self.window)
+
+    def step(self, c, commit):
+        x = float(getattr(c, self.source))
+        full = len(self.window) == self.n
+        total = self.sum+x-(self.window[0] if full else 0)
+        value = total/self.n if full or len(self.window) == self.n-1 else None
+        if commit:
+            self.sum = total
+            self.push(x)
+        return value
+
+    def batch(self, frame):
+        x = np.concatenate((np.array(self.window, dtype='float64'), getattr(frame, self.source)))
+        out = np.full(len(x), np.nan)
+        if len(x) >= self.n:
+            out[self.n-1:] = rolling_sum(x, self.n)/self.n
+        out = out[len(self.window):]
+        self.window.extend(x[-self.n:].tolist())
+        self.sum = math.fsum(self.window)
+        self.value = to_value(out[-1])
+        return out
+
+    def __str__(self):
+        return f'sma {self.n} {self.source}: {self.value}'
+
+class EMA(Indicator):
+
+    def __init__(self, n, source='close', stream=None):
+        self.n = n
+        self.source = source
+        self.alpha = 2/(n+1)
+        self.ema = None
+        super().__init__(stream)
+
+    def step(self, c, commit):
+        x = float(getattr(c, self.source))
+        y = x if self.ema is None else self.ema+self.alpha*(x-self.ema)
+        if commit:
+            self.ema = y
+        return y
+
+    def batch(self, frame):
+        out = ewm(getattr(frame, self.source), self.alpha, self.ema)
+        self.ema = self.value = float(out[-1])
+        return out
+
+    def __str__(self):
+        return f'ema {self.n} {self.source}: {self.value}'
+
+def rsi(gain, loss):
+    if loss == 0:
+        return 50.0 if gain == 0 else 100.0
+    return 100-100/(1+gain/loss)
+
+class RSI(Indicator): # wilder smoothing, seeded with the first change
+
+    def __init__(self, n=14, stream=None):
+        self.n = n
+        self.alpha = 1/n
+        self.prev = None
+        self.gain = None
+        self.loss = None
+        super().__init__(stream)
+
+    def step(self, c, commit):
+        x = float(c.close)
+        if self.prev is None:
+            if commit:
+                self.prev = x
+            return None
+        d = x-self.prev
+        g, l = max(d, 0.0), max(-d, 0.0)
+        if self.gain is not None:
+            g = self.gain+self.alpha*(g-self.gain)
+            l = self.loss+self.alpha*(l-self.loss)
+        if commit:
+            self.prev, self.gain, self.loss = x, g, l
+        return rsi(g, l)
+
+    def batch(self, frame):
+        x = frame.close
+        prev = x[0] if self.prev is None else self.prev
+        d = np.diff(np.concatenate(([prev], x)))
+        if self.prev is None:
+            d = d[1:]
+        g = ewm(np.maximum(d, 0), self.alpha, self.gain)
+        l = ewm(np.maximum(-d, 0), self.alpha, self.loss)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.where(l == 0, np.where(g == 0, 50.0, 100.0), 100-100/(1+g/l))
+        out = np.concatenate(([np.nan], values)) if self.prev is None else values
+        self.prev = float(x[-1])
+        if len(d) > 0:
+            self.gain, self.loss = float(g[-1]), float(l[-1])
+        self.value = to_value(out[-1])
+        return out
+
+    def __str__(self):
+        return f'rsi {self.n}: {self.value}'
+
+class ATR(Indicator): # wilder smoothing of the true range, seeded with the first range
+
+    def __init__(self, n=14, stream=None):
+        self.n = n
+        self.alpha = 1/n
+        self.prev = None
+        self.atr = None
+        super().__init__(stream)
+
+    def step(self, c, commit):
+        high, low, close = float(c.high), float(c.low), float(c.close)
+        tr = high-low
+        if self.prev is not None:
+            tr = max(tr, abs(high-self.prev), abs(low-self.prev))
+        y = tr if self.atr is None else self.atr+self.alpha*(tr-self.atr)
+        if commit:
+            self.prev, self.atr = close, y
+        return y
+
+    def batch(self, frame):
+        high, low, close = frame.high, frame.low, frame.close
+        prev = np.concatenate(([np.nan if self.prev is None else self.prev], close[:-1]))
+        tr = np.fmax(high-low, np.fmax(np.abs(high-prev), np.abs(low-prev))) # fmax skips the missing first close
+        out = ewm(tr, self.alpha, self.atr)
+        self.prev = float(close[-1])
+        self.atr = self.value = float(out[-1])
+        return out
+
+    def __str__(self):
+        return f'atr {self.n}: {self.value}'
+
+class BollingerBands(SMA): # value is (middle, upper, lower), population deviation
+
+    def __init__(self, n=20, k=2, source='close', stream=None):
+        self.k = k
+        self.ref = None # values are shifted by the first one to keep the sum of squares well conditioned
+        self.sumsq = 0.0
+        super().__init__(n, source, stream)
+
+    def push(self, x):
+        super().push(x)
+        if self.commits%self.n == 0:
+            self.sumsq = math.fsum((v-self.ref)**2 for v in self.window)
+
+    def bands(self, total, sumsq):
+        mean = total/self.n
+        d = self.k*math.sqrt(max(sumsq/self.n-(mean-self.ref)**2, 0.0))
+        return (mean, mean+d, mean-d)
+
+    def step(self, c, commit):
+        x = float(getattr(c, self.source))
+        if self.ref is None:
+            self.ref = x
+        full = len(self.window) == self.n
+        sumsq = self.sumsq+(x-self.ref)**2-((self.window[0]-self.ref)**2 if full else 0)
+        total = self.sum+x-(self.window[0] if full else 0)
+        value = self.bands(total, sumsq) if full or len(self.window) == self.n-1 else None
+        if commit:
+            self.sum, self.sumsq = total, sumsq
+            self.push(x)
+        return value
+
+    def batch(self, frame):
+        x = np.concatenate((np.array(self.window, dtype='float64'), getattr(frame, self.source)))
+        if self.ref is None:
+            self.ref = float(x[0])
+        out = np.full((3, len(x)), np.nan)
+        if len(x) >= self.n:
+            mean = rolling_sum(x, self.n)/self.n
+            d = self.k*np.sqrt(np.maximum(rolling_sum((x-self.ref)**2, self.n)/self.n-(mean-self.ref)**2, 0))
+            out[:, self.n-1:] = (mean, mean+d, mean-d)
+        out = out[:, len(self.window):]
+        self.window.extend(x[-self.n:].tolist())
+        self.sum = math.fsum(self.window)
+        self.sumsq = math.fsum((v-self.ref)**2 for v in self.window)
+        self.value = None if math.isnan(out[0, -1]) else tuple(float(v) for v in out[:, -1])
+        return out
+
+    def __str__(self):
+        return f'bollinger bands {self.n}, {self.k} {self.source}: {self.value}'
+
+class VWAP(Indicator): # of the typical price, restarting at each anchor timeframe, or never when anchor is None
+
+    def __init__(self, anchor='1d', stream=None):
+        self.anchor = anchor
+        self.session = None
+        self.pv = 0.0
+        self.v = 0.0
+        super().__init__(stream)
+
+    def step(self, c, commit):
+        tp = (float(c.high)+float(c.low)+float(c.close))/3
+        volume = float(c.volume)
+        session = None if self.anchor is None else timeframe_floor_ms(int(c.open_time.timestamp()*1000), self.anchor)
+        pv, v = (self.pv, self.v) if session == self.session else (0.0, 0.0)
+        pv, v = pv+tp*volume, v+volume
+        if commit:
+            self.session, self.pv, self.v = session, pv, v
+        return pv/v if v > 0 else tp
+
+    def batch(self, frame):
+        tp = (frame.high+frame.low+frame.close)/3
+        volume = frame.volume.astype('float64')
+        if self.anchor is None:
+            sessions = np.zeros(len(frame), dtype='int64')
+        elif self.anchor.endswith('M'):
+            sessions = np.array([timeframe_floor_ms(int(t), self.anchor) for t in frame.open_time], dtype='int64')
+        else:
+            sessions = timeframe_floor_ms(frame.open_time, self.anchor)
+        pv = tp*volume
+        if (sessions[0] if self.anchor is not None else None) == self.session:
+            pv[0] += self.pv
+            volume[0] += self.v
+        starts = np.flatnonzero(np.diff(sessions))+1
+        cpv, cv = np.cumsum(pv), np.cumsum(volume)
+        first = np.zeros(len(frame), dtype='int64')
+        first[starts] = starts
+        first = np.maximum.accumulate(first) # index where each row's session starts
+        spv = cpv-np.where(first > 0, cpv[first-1], 0)
+        sv = cv-np.where(first > 0, cv[first-1], 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = np.where(sv > 0, spv/sv, tp)
+        self.session = None if self.anchor is None else int(sessions[-1])
+        self.pv, self.v = float(spv[-1]), float(sv[-1])
+        self.value = float(out[-1])
+        return out
+
+    def __str__(self):
+        return f'vwap {self.anchor}: {self.value}'
@@ -7,8 +7,10 @@
 
 # status: submit, cancel, partial, fill
 
-class Order:
-    
+class Order: # an entity: equality and hash stay identity based since id is assigned on submit
+
+    __slots__ = ('symbol', 'type', 'side', 'size', 'price', 'stop_price', 'reduce_only', 'post_only', 'id')
+
     def __init__(self, symbol, type, side, size, price=None, stop_price=None, reduce_only=False, post_only=False, id=None):
         self.symbol = symbol
         self.type = type
@@ -28,6 +30,8 @@ class Order:
 
 class OrderUpdate:
 
+    __slots__ = ('order', 'time', 'status', 'size', 'total_size', 'price', 'average_price')
+
     last_id = 0
 
     def __init__(self, order, time, status, size, total_size, price, average_price):
@@ -38,7 +42,18 @@ class OrderUpdate:
         self.total_size = total_size
         self.price = price
         self.average_price = average_price
-        
+
+    def astuple(self):
+        return (self.order.id, self.time, self.status, self.size, self.total_size, self.price, self.average_price)
+
+    def __eq__(self, other):
+        if not isinstance(other, OrderUpdate):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __hash__(self):
+        return hash((self.order.id, self.time, self.status, self.total_size))
+
     def __str__(self):
         return f'order update id:{self.order.id}, t:{self.time}, status:{self.status}, price:{self.price}, size:{self.size}'
 
@@ -1,19 +1,147 @@
 import asyncio
 import logging
+from .frame import CandleFrame, TradeFrame
+from .account import Balance, Position
 
 log = logging.getLogger('aiotrading')
 
+class StreamQueue(asyncio.Queue):
+
+    policies = ('block', 'drop_oldest', 'drop_newest', 'conflate')
+
+    def __init__(self, maxsize=0, policy='block', key=None):
+        if policy not in self.policies:
+            raise Exception(f'invalid queue policy {policy}')
+        self.policy = policy
+        self.key = key # conflate items having the same key, all items if None
+        self.drops = 0
+        self.high_water = 0
+        super().__init__(maxsize)
+
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self.cells = {}
+
+    def _put(self, item):
+        if self.policy == 'conflate':
+            k = self.key(item) if self.key is not None else None
+            cell = [k, item]
+            self.cells[k] = cell
+            item = cell
+        self._queue.append(item)
+
+    def _get(self):
+        item = self._queue.popleft()
+        if self.policy == 'conflate':
+            k, cell, item = item[0], item, item[1]
+            if self.cells.get(k) is cell:
+                del self.cells[k]
+        return item
+
+    def write_nowait(self, d): # returns False when a blocking queue is full
+        if self.policy == 'conflate':
+            cell = self.cells.get(self.key(d) if self.key is not None else None)
+            if cell is not None:
+                cell[1] = d
+                self.drops += 1
+                return True
+        if self.full():
+            if self.policy == 'block':
+                return False
+            if self.policy == 'drop_newest':
+                self.drops += 1
+                return True
+            self.get_nowait()
+            self.drops += 1
+        self.put_nowait(d)
+        self.high_water = max(self.high_water, self.qsize())
+        return True
+
+    async def write(self, d):
+        if not self.write_nowait(d):
+            await self.write_wait(d)
+
+    async def write_wait(self, d): # for a full blocking queue
+        await self.put(d)
+        self.high_water = max(self.high_water, self.qsize())
+
+    async def read_many(self, n, timeout=None):
+        # wait up to timeout for the first item, then take what is already buffered
+        items = []
+        if self.empty():
+            try:
+                items.append(await asyncio.wait_for(self.get(), timeout))
+            except asyncio.TimeoutError:
+                return items
+        while len(items) < n and not self.empty():
+            items.append(self.get_nowait())
+        return items
+
 class Stream:
 
-    def __init__(self, exchange):
+    def __init__(self, exchange, maxsize=0, policy='block'):
         self.exchange = exchange
-        self.queue = asyncio.Queue()
+        self.queue = StreamQueue(maxsize, policy, self.conflate_key)
+        self.mix = None # while in a mixed stream, items go straight to its queue
+        self.taps = [] # objects whose update(d) sees every item on write, before it is queued
 
     async def read(self):
         return await self.queue.get()
 
+    async def read_batch(self, max_items=1000, max_wait=None, frame=False):
+        items = await self.queue.read_many(max_items, max_wait)
+        return self.to_frame(items) if frame else items
+
+    async def batches(self, max_items=1000, max_wait=None, frame=False):
+        while True:
+            items = await self.queue.read_many(max_items, max_wait)
+            if len(items) > 0:
+                yield self.to_frame(items) if frame else items
+
+    def to_frame(self, items):
+        raise Exception(f'{self} has no columnar form')
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.read()
+
     async def write(self, d):
-        await self.queue.put(d)
+        if not self.write_nowait(d):
+            await self.write_wait(d)
+
+    def write_nowait(self, d):
+        if self.taps:
+            for tap in self.taps:
+                tap.update(d)
+        if self.mix is not None:
+            return self.mix.queue.write_nowait((self, d))
+        return self.queue.write_nowait(d)
+
+    async def write_wait(self, d): # after write_nowait found a full blocking queue
+        if self.mix is not None:
+            await self.mix.queue.write_wait((self, d))
+        else:
+            await self.queue.write_wait(d)
+
+    def tap(self, tap):
+        self.taps.append(tap)
+        return tap
+
+    def untap(self, tap):
+        self.taps.remove(tap)
+
+    def conflate_key(self, d):
+        return None
+
+    @property
+    def drops(self):
+        return self.queue.drops
+
+    @property
+    def high_water(self):
+        return self.queue.high_water
 
     async def open(self):
         await self.exchange.open_stream(self)
@@ -36,58 +164,161 @@ class Stream:
 
 class CandleStream(Stream):
 
-    def __init__(self, exchange, symbol, timeframe):
-        super().__init__(exchange)
+    def __init__(self, exchange, symbol, timeframe, maxsize=0, policy='block'):
+        super().__init__(exchange, maxsize, policy)
         self.symbol = symbol
         self.timeframe = timeframe
 
+    def conflate_key(self, d):
+        return d.open_time # a candle update supersedes earlier ones of the same candle
+
+    def to_frame(self, items):
+        return CandleFrame.from_candles(self.symbol, self.timeframe, items)
+
     def __str__(self):
         return f'candle stream {self.symbol}@{self.timeframe}'
 
 class TradeStream(Stream):
 
-    def __init__(self, exchange, symbol):
-        super().__init__(exchange)
+    def __init__(self, exchange, symbol, maxsize=0, policy='block'):
+        super().__init__(exchange, maxsize, policy)
         self.symbol = symbol
 
+    def to_frame(self, items):
+        return TradeFrame.from_trades(self.symbol, items)
+
     def __str__(self):
         return f'trade stream {self.symbol}'
 
+class OrderBookStream(Stream): # items are the exchange's book of the symbol, updated in place
+
+    def __init__(self, exchange, symbol, maxsize=0, policy='conflate'):
+        super().__init__(exchange, maxsize, policy)
+        self.symbol = symbol
+
+    def __str__(self):
+        return f'order book stream {self.symbol}'
+
+class TickerStream(Stream): # the latest item per symbol, conflated by symbol unless another policy is given
+
+    def __init__(self, exchange, symbol=None, maxsize=0, policy='conflate'):
+        super().__init__(exchange, maxsize, policy)
+        self.symbol = symbol # None for all symbols
+        self.latest = {} # symbol -> last item written, for reading quotes without the queue
+
+    def write_nowait(self, d):
+        self.latest[d.symbol] = d
+        return super().write_nowait(d)
+
+    def conflate_key(self, d):
+        return d.symbol
+
+class BookTickerStream(TickerStream):
+
+    def __str__(self):
+        return f'book ticker stream {self.symbol or "all symbols"}'
+
+class MarkPriceStream(TickerStream):
+
+    def __init__(self, exchange, symbol=None, interval='1s', maxsize=0, policy='conflate'):
+        super().__init__(exchange, symbol, maxsize, policy)
+        self.interval = interval # 1s or 3s
+
+    def __str__(self):
+        return f'mark price stream {self.symbol or "all symbols"}@{self.interval}'
+
 class OrderUpdateStream(Stream):
 
-    def __init__(self, exchange, order=None):
-        super().__init__(exchange)
+    def __init__(self, exchange, order=None, maxsize=0, policy='block'):
+        super().__init__(exchange, maxsize, policy)
         self.order = order
 
     def __str__(self):
+        if self.order is None:
+            return 'order update stream for all orders'
         return f'order update stream {self.order.id}'
 
+class AccountStream(Stream): # balance, position and order changes of the account
+
+    def conflate_key(self, d):
+        if isinstance(d, Balance):
+            return d.asset
+        if isinstance(d, Position):
+            return d.symbol, d.side
+        return d.order.id
+
+    def __str__(self):
+        return 'account stream'
+
 class MixedStream:
 
-    def __init__(self, streams):
-        self.streams = streams
-        self.queue = asyncio.Queue()
+    def __init__(self, streams, maxsize=0, policy='block'):
+        self.streams = list(streams)
+        self.queue = StreamQueue(maxsize, policy, self.conflate_key)
+        self.opened = False
 
     async def read(self):
         return await self.queue.get()
 
-    async def worker(self, stream):
-        while True:
-            d = await stream.read()
-            await self.queue.put((stream, d))
-        
+    def conflate_key(self, item):
+        stream, d = item
+        return stream, stream.conflate_key(d)
+
+    @property
+    def drops(self):
+        return self.queue.drops
+
+    @property
+    def high_water(self):
+        return self.queue.high_water
+
+    async def read_many(self, n, timeout=None):
+        return await self.queue.read_many(n, timeout)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.read()
+
+    def attach(self, stream):
+        if stream.mix is not None:
+            raise Exception(f'{stream} is already in {stream.mix}')
+        stream.mix = self
+        while not stream.queue.empty(): # keep what the stream buffered before joining
+            self.queue.write_nowait((stream, stream.queue.get_nowait()))
+
+    def detach(self, stream):
+        stream.mix = None
+
+    async def add(self, stream):
+        log.info(f'adding {stream} to {self}')
+        self.attach(stream)
+        self.streams.append(stream)
+        if self.opened:
+            await stream.open()
+
+    async def remove(self, stream):
+        log.info(f'removing {stream} from {self}')
+        self.streams.remove(stream)
+        if self.opened:
+            await stream.close()
+        self.detach(stream)
+
     async def open(self):
         log.info(f'opening {self}')
-        self.tasks = [asyncio.get_event_loop().create_task(self.worker(stream)) for stream in self.streams]
         for stream in self.streams:
-            await stream.open()
+            if stream.mix is not self:
+                self.attach(stream)
+        await asyncio.gather(*[stream.open() for stream in self.streams])
+        self.opened = True
 
     async def close(self):
         log.info(f'closing {self}')
-        await asyncio.wait([stream.close() for stream in self.streams], return_when=asyncio.ALL_COMPLETED)
-        for task in self.tasks:
-            task.cancel()
-        await asyncio.wait(self.tasks, return_when=asyncio.ALL_COMPLETED)
+        self.opened = False
+        await asyncio.gather(*[stream.close() for stream in self.streams])
+        for stream in self.streams:
+            self.detach(stream)
 
     async def __aenter__(self):
         await self.open()
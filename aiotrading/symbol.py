@@ -0,0 +1,97 @@
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+
+# trading rules of a symbol. prices are held as integer units of 10**-price_decimals
+# and sizes of 10**-size_decimals, so checks are integer compares and modulos.
+
+def to_decimal(v): # floats by their shortest repr, as str() sends them, not their exact binary value
+    return v if isinstance(v, Decimal) else Decimal(str(v))
+
+def decimals(*values):
+    return max(max(0, -to_decimal(v).normalize().as_tuple().exponent) for v in values)
+
+def to_units(v, n): # None when v is finer than n decimals
+    v = to_decimal(v).scaleb(n)
+    i = int(v)
+    return i if i == v else None
+
+class SymbolInfo:
+
+    __slots__ = ('symbol', 'tick_size', 'step_size', 'market_step_size', 'price_decimals', 'size_decimals',
+        'tick', 'min_price', 'max_price', 'step', 'min_size', 'max_size', 'market_step', 'market_min_size',
+        'market_max_size', 'min_notional', 'band_decimals', 'band_up', 'band_down')
+
+    def __init__(self, symbol, tick_size, step_size, min_price=0, max_price=0, min_size=0, max_size=0,
+            market_step_size=None, market_min_size=None, market_max_size=None, min_notional=0,
+            band_up=None, band_down=None):
+        # zero max values mean no limit; band_up/band_down bound limit prices relative to the mark price
+        market_step_size = market_step_size or step_size
+        market_min_size = market_min_size if market_min_size is not None else min_size
+        market_max_size = market_max_size if market_max_size is not None else max_size
+        self.symbol = symbol
+        self.tick_size = Decimal(tick_size)
+        self.step_size = Decimal(step_size)
+        self.market_step_size = Decimal(market_step_size)
+        self.price_decimals = pd = decimals(tick_size, min_price, max_price)
+        self.size_decimals = sd = decimals(step_size, min_size, max_size, market_step_size, market_min_size, market_max_size)
+        self.tick = to_units(tick_size, pd)
+        self.min_price = to_units(min_price, pd)
+        self.max_price = to_units(max_price, pd)
+        self.step = to_units(step_size, sd)
+        self.min_size = to_units(min_size, sd)
+        self.max_size = to_units(max_size, sd)
+        self.market_step = to_units(market_step_size, sd)
+        self.market_min_size = to_units(market_min_size, sd)
+        self.market_max_size = to_units(market_max_size, sd)
+        self.min_notional = int((Decimal(min_notional).scaleb(pd+sd)).to_integral_value(ROUND_HALF_UP))
+        if band_up is not None:
+            self.band_decimals = bd = decimals(band_up, band_down)
+            self.band_up = to_units(band_up, bd)
+            self.band_down = to_units(band_down, bd)
+        else:
+            self.band_decimals = self.band_up = self.band_down = None
+
+    def quantize_price(self, price, rounding=ROUND_HALF_UP):
+        return (Decimal(price)/self.tick_size).to_integral_value(rounding)*self.tick_size
+
+    def quantize_size(self, size, market=False, rounding=ROUND_DOWN):
+        step = self.market_step_size if market else self.step_size
+        return (Decimal(size)/step).to_integral_value(rounding)*step
+
+    def validate(self, order, mark_price=None):
+        # returns why the exchange would reject the order, None if it would not
+        if order.type == 'market':
+            step, min_size, max_size = self.market_step, self.market_min_size, self.market_max_size
+        else:
+            step, min_size, max_size = self.step, self.min_size, self.max_size
+        size = to_units(order.size, self.size_decimals)
+        if size is None or size%step != 0:
+            return f'size {order.size} is not a multiple of {self.market_step_size if order.type == "market" else self.step_size}'
+        if size < min_size or max_size and size > max_size:
+            return f'size {order.size} is out of range'
+        for p in (order.price, order.stop_price):
+            if p is None:
+                continue
+            price = to_units(p, self.price_decimals)
+            if price is None or price%self.tick != 0:
+                return f'price {p} is not a multiple of {self.tick_size}'
+            if price < self.min_price or self.max_price and price > self.max_price:
+                return f'price {p} is out of range'
+        mark = int(to_decimal(mark_price).scaleb(self.price_decimals)) if mark_price is not None else None
+        price = to_units(order.price, self.price_decimals) if order.price is not None else mark # market orders fill near the mark
+        if price is None:
+            return None
+        if not order.reduce_only and price*size < self.min_notional:
+            return f'notional {(order.price or mark_price)*order.size} is below the minimum'
+        if order.price is not None and mark is not None and self.band_up is not None:
+            band = 10**self.band_decimals
+            if order.side == 'buy' and price*band > mark*self.band_up:
+                return f'price {order.price} is above the band of mark price {mark_price}'
+            if order.side == 'sell' and price*band < mark*self.band_down:
+                return f'price {order.price} is below the band of mark price {mark_price}'
+        return None
+
+    def __str__(self):
+        return f'symbol info {self.symbol}, tick:{self.tick_size}, step:{self.step_size}'
+
+    def __repr__(self):
+        return self.__str__()
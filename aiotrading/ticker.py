@@ -0,0 +1,57 @@
+class BookTicker: # best bid and ask
+
+    __slots__ = ('symbol', 'time', 'bid', 'bid_size', 'ask', 'ask_size')
+
+    def __init__(self, symbol, time, bid, bid_size, ask, ask_size):
+        self.symbol = symbol
+        self.time = time
+        self.bid = bid
+        self.bid_size = bid_size
+        self.ask = ask
+        self.ask_size = ask_size
+
+    def astuple(self):
+        return (self.symbol, self.time, self.bid, self.bid_size, self.ask, self.ask_size)
+
+    def __eq__(self, other):
+        if not isinstance(other, BookTicker):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __hash__(self):
+        return hash((self.symbol, self.time))
+
+    def __str__(self):
+        return f'book ticker symbol:{self.symbol}, time:{self.time}, bid:{self.bid}x{self.bid_size}, ask:{self.ask}x{self.ask_size}'
+
+    def __repr__(self):
+        return self.__str__()
+
+class MarkPrice:
+
+    __slots__ = ('symbol', 'time', 'price', 'index_price', 'funding_rate', 'funding_time')
+
+    def __init__(self, symbol, time, price, index_price, funding_rate, funding_time):
+        self.symbol = symbol
+        self.time = time
+        self.price = price
+        self.index_price = index_price
+        self.funding_rate = funding_rate
+        self.funding_time = funding_time # of the next funding
+
+    def astuple(self):
+        return (self.symbol, self.time, self.price, self.index_price, self.funding_rate, self.funding_time)
+
+    def __eq__(self, other):
+        if not isinstance(other, MarkPrice):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __hash__(self):
+        return hash((self.symbol, self.time))
+
+    def __str__(self):
+        return f'mark price symbol:{self.symbol}, time:{self.time}, price:{self.price}, index:{self.index_price}, funding rate:{self.funding_rate}'
+
+    def __repr__(self):
+        return self.__str__()
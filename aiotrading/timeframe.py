@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+# month candles are calendar aligned; 28 days is the shortest month and
+# keeps time based paging gapless (overlaps are removed by callers)
+timeframe_units = {'m': 60, 'h': 60*60, 'd': 24*60*60, 'w': 7*24*60*60, 'M': 28*24*60*60}
+
+def timeframe_seconds(timeframe):
+    n, unit = timeframe[:-1], timeframe[-1]
+    if unit not in timeframe_units or not n.isdigit():
+        raise Exception(f'invalid timeframe {timeframe}')
+    return int(n)*timeframe_units[unit]
+
+def timeframe_delta(timeframe):
+    return timedelta(seconds=timeframe_seconds(timeframe))
+
+def split_time_range(start_time, end_time, step):
+    ranges = []
+    while start_time < end_time:
+        ranges.append((start_time, min(start_time+step, end_time)))
+        start_time += step
+    return ranges
+
+def timeframe_parse(timeframe):
+    timeframe_seconds(timeframe) # validates
+    return int(timeframe[:-1]), timeframe[-1]
+
+def timeframe_floor_ms(ms, timeframe):
+    # candles are aligned to utc: weeks start on monday, months on the 1st
+    n, unit = timeframe_parse(timeframe)
+    if unit == 'M':
+        d = datetime.fromtimestamp(ms/1000, timezone.utc)
+        months = (d.year*12+d.month-1)//n*n
+        return int(datetime(months//12, months%12+1, 1, tzinfo=timezone.utc).timestamp()*1000)
+    size = timeframe_seconds(timeframe)*1000
+    offset = 4*24*60*60*1000 if unit == 'w' else 0 # the epoch was a thursday
+    return (ms-offset)//size*size+offset
+
+def timeframe_next_ms(ms, timeframe):
+    n, unit = timeframe_parse(timeframe)
+    start = timeframe_floor_ms(ms, timeframe)
+    if unit == 'M':
+        d = datetime.fromtimestamp(start/1000, timezone.utc)
+        months = d.year*12+d.month-1+n
+        return int(datetime(months//12, months%12+1, 1, tzinfo=timezone.utc).timestamp()*1000)
+    return start+timeframe_seconds(timeframe)*1000
+
+def timeframe_floor(t, timeframe):
+    return datetime.fromtimestamp(timeframe_floor_ms(int(t.timestamp()*1000), timeframe)/1000)
+
+def timeframe_next(t, timeframe):
+    return datetime.fromtimestamp(timeframe_next_ms(int(t.timestamp()*1000), timeframe)/1000)
@@ -1,6 +1,7 @@
-
 class Trade:
 
+    __slots__ = ('symbol', 'id', 'time', 'price', 'volume', 'buy')
+
     def __init__(self, symbol, id, time, price, volume, buy):
         self.symbol = symbol
         self.id = id
@@ -9,6 +10,17 @@ class Trade:
         self.volume = volume
         self.buy = buy
 
+    def astuple(self):
+        return (self.symbol, self.id, self.time, self.price, self.volume, self.buy)
+
+    def __eq__(self, other):
+        if not isinstance(other, Trade):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __hash__(self):
+        return hash((self.symbol, self.id))
+
     def __str__(self):
         return f'trade symbol:{self.symbol}, id:{self.id}, time:{self.time}, price:{self.price}, volume:{self.volume}'
 
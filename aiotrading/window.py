@@ -0,0 +1,137 @@
+from .frame import CandleFrame, TradeFrame, np
+
+# rolling windows keep the last n items of a stream in preallocated columns.
+# every row is written twice, at i and i+n, so the window is always one
+# contiguous slice and column views never copy.
+
+class Window:
+
+    columns = {}
+
+    def __init__(self, size, stream=None):
+        if np is None:
+            raise Exception(f'{type(self).__name__} requires numpy')
+        self.size = size
+        self.data = {k: np.zeros(2*size, dtype=t) for k, t in self.columns.items()}
+        self.count = 0 # rows ever appended
+        self.stream = None
+        if stream is not None:
+            self.attach(stream)
+
+    def attach(self, stream):
+        self.stream = stream
+        stream.tap(self)
+
+    def detach(self):
+        self.stream.untap(self)
+        self.stream = None
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def __getattr__(self, name):
+        if name in type(self).columns:
+            d = self.__dict__
+            n = min(d['count'], d['size'])
+            start = (d['count']-n)%d['size']
+            return d['data'][name][start:start+n]
+        raise AttributeError(name)
+
+    def views(self):
+        return {k: getattr(self, k) for k in self.columns}
+
+    def put(self, i, row):
+        # i counts rows ever appended, row holds one value per column
+        i %= self.size
+        for k, v in zip(self.columns, row):
+            a = self.data[k]
+            a[i] = v
+            a[i+self.size] = v
+
+    def append(self, row):
+        self.put(self.count, row)
+        self.count += 1
+
+    def append_columns(self, **data):
+        n = len(data[next(iter(self.columns))])
+        skip = max(n-self.size, 0) # rows that would be overwritten anyway
+        i = (self.count+skip+np.arange(n-skip))%self.size
+        for k in self.columns:
+            v = data[k][skip:]
+            self.data[k][i] = v
+            self.data[k][i+self.size] = v
+        self.count += n
+
+    def clear(self):
+        self.count = 0
+
+    def __repr__(self):
+        return self.__str__()
+
+class CandleWindow(Window):
+
+    columns = CandleFrame.columns
+
+    def update(self, c):
+        # a provisional candle overwrites its bar in place, a later open time rolls over
+        t = int(c.open_time.timestamp()*1000)
+        if self.count > 0:
+            last = self.data['open_time'][(self.count-1)%self.size]
+            if t < last:
+                return
+            if t == last:
+                self.put(self.count-1, self.to_row(c, t))
+                return
+        self.append(self.to_row(c, t))
+
+    def to_row(self, c, t):
+        return (t, int(c.update_time.timestamp()*1000), c.open, c.high, c.low, c.close,
+            c.volume, c.buy_volume, c.trades, c.closed)
+
+    def extend(self, candles):
+        # warm up from history, a list of candles or a CandleFrame
+        if not isinstance(candles, CandleFrame):
+            for c in candles:
+                self.update(c)
+            return
+        data = {k: getattr(candles, k) for k in self.columns}
+        if self.count > 0:
+            last = self.data['open_time'][(self.count-1)%self.size]
+            keep = data['open_time'] > last
+            if len(keep) > 0 and data['open_time'][0] == last:
+                self.put(self.count-1, [data[k][0] for k in self.columns])
+            data = {k: v[keep] for k, v in data.items()}
+        self.append_columns(**data)
+
+    def frame(self):
+        # a frame over the window views, valid until the next update
+        return CandleFrame(getattr(self.stream, 'symbol', None), getattr(self.stream, 'timeframe', None), **self.views())
+
+    def __str__(self):
+        return f'candle window {self.stream}, length:{len(self)}/{self.size}'
+
+class TradeWindow(Window):
+
+    columns = TradeFrame.columns
+
+    def update(self, t):
+        if self.count > 0 and t.id <= self.data['id'][(self.count-1)%self.size]:
+            return # replayed after a reconnect
+        self.append((t.id, int(t.time.timestamp()*1000), t.price, t.volume, t.buy))
+
+    def extend(self, trades):
+        if not isinstance(trades, TradeFrame):
+            for t in trades:
+                self.update(t)
+            return
+        data = {k: getattr(trades, k) for k in self.columns}
+        if self.count > 0:
+            keep = data['id'] > self.data['id'][(self.count-1)%self.size]
+            data = {k: v[keep] for k, v in data.items()}
+        self.append_columns(**data)
+
+    def frame(self):
+        return TradeFrame(getattr(self.stream, 'symbol', None), **self.views())
+
+    def __str__(self):
+        return f'trade window {self.stream}, length:{len(self)}/{self.size}'
@@ -0,0 +1,22 @@
+import asyncio
+import logging
+from aiotrading import AccountStream
+from aiotrading.exchange import BinanceFutures
+
+API_KEY = 'YOUR_API_KEY'
+API_SECRET = 'YOUR_API_SECRET'
+
+log = logging.getLogger('aiotrading')
+
+async def main():
+    async with BinanceFutures(API_KEY, API_SECRET) as exchange:
+        async with AccountStream(exchange) as stream: # seeds exchange.account from one rest snapshot
+            account = exchange.account
+            log.info(f'{account}, usdt:{account.balance("USDT")}, btcusdt:{account.position("btcusdt")}')
+            while True:
+                change = await stream.read()
+                log.info(change)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s: %(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,31 @@
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from aiotrading import HistoryCache
+from aiotrading.exchange import BinanceFutures
+
+log = logging.getLogger('aiotrading')
+
+async def startup(path, symbols):
+    t0 = time.perf_counter()
+    async with BinanceFutures(cache=HistoryCache(path)) as exchange:
+        for symbol in symbols:
+            await exchange.candle_history(symbol, '1m', datetime(2021, 1, 1), 10000)
+        requests = sum(s.count for s in exchange.rest_latency.values())
+    return time.perf_counter()-t0, requests
+
+async def main():
+    symbols = ['btcusdt', 'ethusdt', 'ltcusdt']
+    path = os.path.join(tempfile.mkdtemp(), 'history.db')
+    t, n = await startup(path, symbols)
+    log.info(f'cold startup: {t:.2f}s, {n} rest requests')
+    t, n = await startup(path, symbols)
+    log.info(f'warm startup: {t:.2f}s, {n} rest requests')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    log.setLevel(logging.INFO)
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,36 @@
+import json
+import logging
+import time
+from aiotrading.exchange import BinanceFutures
+from aiotrading.exchange import decoder
+
+log = logging.getLogger('aiotrading')
+
+# recorded market stream frames
+kline = '{"stream":"btcusdt@kline_1m","data":{"e":"kline","E":1611999599123,"s":"BTCUSDT","k":{"t":1611999540000,"T":1611999599999,"s":"BTCUSDT","i":"1m","f":495016270,"L":495016931,"o":"33795.69","c":"33797.39","h":"33800.89","l":"33789.99","v":"52.146","n":662,"x":false,"q":"1762245.26154","V":"22.531","Q":"761435.07781","B":"0"}}}'
+agg_trade = '{"stream":"btcusdt@aggTrade","data":{"e":"aggTrade","E":1611999599123,"a":394621834,"s":"BTCUSDT","p":"33797.39","q":"0.012","f":495016930,"l":495016931,"T":1611999599118,"m":true}}'
+
+def run(name, frames, loads, parse, touch, n=200000):
+    t0 = time.perf_counter()
+    for i in range(n):
+        item = parse(loads(frames[i%len(frames)]))
+        touch(item)
+    t = time.perf_counter()-t0
+    log.info(f'{name:32} {n/t:12,.0f} messages/s')
+
+def read_close(item):
+    return item.close if hasattr(item, 'close') else item.price
+
+def read_nothing(item):
+    pass
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    exchange = BinanceFutures()
+    frames = [kline, agg_trade]
+    log.info(f'json backend: {decoder.backend}')
+    run('json.loads only', frames, json.loads, lambda j: j, read_nothing)
+    run(f'{decoder.backend} loads only', frames, decoder.loads, lambda j: j, read_nothing)
+    run(f'{decoder.backend} + parse, no access', frames, decoder.loads, exchange.mws_parse_message, read_nothing)
+    run(f'{decoder.backend} + parse, read close', frames, decoder.loads, exchange.mws_parse_message, read_close)
+    run(f'{decoder.backend} + parse, read all', frames, decoder.loads, exchange.mws_parse_message, str)
@@ -0,0 +1,31 @@
+import asyncio
+import logging
+import time
+from aiotrading import TradeStream
+from aiotrading.exchange import BinanceFutures
+from aiotrading.exchange import decoder
+
+log = logging.getLogger('aiotrading')
+
+agg_trade = '{"stream":"btcusdt@aggTrade","data":{"e":"aggTrade","E":1611999599123,"a":394621834,"s":"BTCUSDT","p":"33797.39","q":"0.012","f":495016930,"l":495016931,"T":1611999599118,"m":true}}'
+
+async def measure(exchange, subscribers, n=2000):
+    endpoint = 'btcusdt@aggTrade'
+    streams = [TradeStream(exchange, 'btcusdt') for i in range(subscribers)]
+    exchange.mws_streams[endpoint] = tuple(streams) # subscribe without a socket
+    item = exchange.mws_parse_message(decoder.loads(agg_trade))
+    t0 = time.perf_counter()
+    for i in range(n):
+        await exchange.mws_dispatch(endpoint, item)
+    t = time.perf_counter()-t0
+    del exchange.mws_streams[endpoint]
+    log.info(f'{subscribers:5} subscribers: {t/n*1e6:9.1f} us/message, {t/n/subscribers*1e9:7.0f} ns/delivery')
+
+async def main():
+    exchange = BinanceFutures()
+    for subscribers in [1, 100, 1000]:
+        await measure(exchange, subscribers)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
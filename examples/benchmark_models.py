@@ -0,0 +1,61 @@
+import logging
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+from aiotrading import Candle, Trade
+
+log = logging.getLogger('aiotrading')
+
+class DictCandle: # model layout before slots, for comparison
+
+    def __init__(self, symbol, timeframe, open_time, update_time, open, high, low, close, volume, buy_volume, trades, closed):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.open_time = open_time
+        self.update_time = update_time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.buy_volume = buy_volume
+        self.trades = trades
+        self.closed = closed
+
+class DictTrade:
+
+    def __init__(self, symbol, id, time, price, volume, buy):
+        self.symbol = symbol
+        self.id = id
+        self.time = time
+        self.price = price
+        self.volume = volume
+        self.buy = buy
+
+def candle_args():
+    t = datetime(2021, 1, 1)
+    d = Decimal('33795.69')
+    return dict(symbol='btcusdt', timeframe='1m', open_time=t, update_time=t, open=d, high=d, low=d, close=d, volume=d, buy_volume=d, trades=10, closed=False)
+
+def trade_args():
+    return dict(symbol='btcusdt', id=1, time=datetime(2021, 1, 1), price=Decimal('33795.69'), volume=Decimal('0.1'), buy=True)
+
+def measure(cls, args, n=200000):
+    tracemalloc.start()
+    objs = [cls(**args) for i in range(n)]
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objs
+    t0 = time.perf_counter()
+    for i in range(n):
+        cls(**args)
+    t = time.perf_counter()-t0
+    log.info(f'{cls.__name__:12} {size/n:7.1f} bytes/object, {n/t:12,.0f} objects/s')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    measure(DictCandle, candle_args())
+    measure(Candle, candle_args())
+    measure(DictTrade, trade_args())
+    measure(Trade, trade_args())
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import logging
+import time
+from decimal import Decimal
+from aiohttp import web
+from aiotrading import Order
+from aiotrading.exchange import BinanceFutures
+from aiotrading.exchange.metrics import LatencyStats
+
+# order round trips over rest and over the websocket api, against a local mock of both
+
+log = logging.getLogger('benchmark') # aiotrading logs every order at info level
+
+async def rest_order(request):
+    return web.json_response({'orderId': 1, 'status': 'NEW'})
+
+async def ws_api(request):
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    async for msg in ws:
+        j = json.loads(msg.data)
+        await ws.send_str(json.dumps({'id': j['id'], 'status': 200, 'result': {'orderId': 1, 'status': 'NEW'}}))
+    return ws
+
+async def measure(exchange, transport, n):
+    stats = LatencyStats()
+    for i in range(n):
+        order = Order(symbol='btcusdt', type='limit', side='buy', size=Decimal('0.001'), price=Decimal('20000'))
+        t0 = time.perf_counter()
+        await exchange.submit_order(order, transport=transport)
+        stats.add(time.perf_counter()-t0)
+    log.info(f'{transport:4}: {stats}')
+
+async def main():
+    app = web.Application()
+    app.router.add_post('/fapi/v1/order', rest_order)
+    app.router.add_get('/ws-fapi/v1', ws_api)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, 'localhost', 8790).start()
+    exchange = BinanceFutures('key', 'secret')
+    exchange.rest_uri = 'http://localhost:8790/fapi/v1/'
+    exchange.wsa_uri = 'ws://localhost:8790/ws-fapi/v1'
+    await measure(exchange, 'rest', 100) # warm up connections
+    await measure(exchange, 'ws', 100)
+    for transport in ['rest', 'ws']:
+        await measure(exchange, transport, 2000)
+    await exchange.close()
+    await runner.cleanup()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    log.setLevel(logging.INFO)
+    asyncio.get_event_loop().run_until_complete(main())
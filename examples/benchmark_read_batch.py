@@ -0,0 +1,42 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from decimal import Decimal
+from aiotrading import Trade, TradeStream
+
+log = logging.getLogger('aiotrading')
+
+async def produce(stream, n, chunk=100):
+    trade = Trade(symbol='btcusdt', id=1, time=datetime(2021, 1, 1), price=Decimal('33795.69'), volume=Decimal('0.1'), buy=True)
+    for i in range(0, n, chunk):
+        for j in range(chunk):
+            stream.write_nowait(trade)
+        await asyncio.sleep(0) # let the consumer run, as a websocket worker would between frames
+
+async def consume_items(stream, n):
+    for i in range(n):
+        await stream.read()
+
+async def consume_batches(stream, n, frame=False):
+    received = 0
+    async for batch in stream.batches(max_items=1000, frame=frame):
+        received += len(batch)
+        if received >= n:
+            break
+
+async def measure(name, consume, n=200000, **kwargs):
+    stream = TradeStream(None, 'btcusdt')
+    t0 = time.perf_counter()
+    await asyncio.gather(produce(stream, n), consume(stream, n, **kwargs))
+    t = time.perf_counter()-t0
+    log.info(f'{name:20} {n/t:12,.0f} items/s')
+
+async def main():
+    await measure('read()', consume_items)
+    await measure('read_batch()', consume_batches)
+    await measure('read_batch(frame)', consume_batches, frame=True)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,18 @@
+import asyncio
+import logging
+from aiotrading import BookTickerStream, MarkPriceStream
+from aiotrading.exchange import BinanceFutures
+
+log = logging.getLogger('aiotrading')
+
+async def main():
+    async with BinanceFutures() as exchange:
+        async with BookTickerStream(exchange) as tickers, MarkPriceStream(exchange) as marks: # all symbols
+            for i in range(10):
+                await asyncio.sleep(1)
+                ticker, mark = tickers.latest.get('btcusdt'), marks.latest.get('btcusdt')
+                log.info(f'{len(tickers.latest)} symbols quoted, {ticker}, {mark}')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
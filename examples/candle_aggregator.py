@@ -0,0 +1,17 @@
+import asyncio
+import logging
+from aiotrading import CandleStream, CandleAggregator
+from aiotrading.exchange import BinanceFutures
+
+log = logging.getLogger('aiotrading')
+
+async def main():
+    async with BinanceFutures() as exchange:
+        async with CandleAggregator(CandleStream(exchange, 'btcusdt', '1m'), ['5m', '15m', '1h']) as aggregator:
+            for i in range(10):
+                candle = await aggregator.streams['15m'].read()
+                log.info(candle)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
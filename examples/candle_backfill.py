@@ -0,0 +1,17 @@
+import asyncio
+import logging
+from datetime import datetime
+from aiotrading.exchange import BinanceFutures
+
+log = logging.getLogger('aiotrading')
+
+async def main():
+    async with BinanceFutures() as exchange:
+        symbols = ['btcusdt', 'ethusdt', 'ltcusdt']
+        candles = await exchange.candle_backfill(symbols, '1h', datetime(2021, 1, 1), datetime(2021, 3, 1))
+        for symbol in symbols:
+            log.info(f'{symbol}: {len(candles[symbol])} candles, first: {candles[symbol][0]}, last: {candles[symbol][-1]}')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
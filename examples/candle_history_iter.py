@@ -0,0 +1,18 @@
+import asyncio
+import logging
+from datetime import datetime
+from aiotrading.exchange import BinanceFutures
+
+log = logging.getLogger('aiotrading')
+
+async def main():
+    async with BinanceFutures() as exchange:
+        high = None
+        async for candle in exchange.iter_candle_history('btcusdt', '1m', datetime(2021, 1, 1), 10000):
+            if high is None or candle.high > high.high:
+                high = candle
+        log.info(f'highest candle: {high}')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
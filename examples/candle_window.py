@@ -0,0 +1,21 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from aiotrading import CandleStream, CandleWindow
+from aiotrading.exchange import BinanceFutures
+
+log = logging.getLogger('aiotrading')
+
+async def main():
+    async with BinanceFutures() as exchange:
+        async with CandleStream(exchange, 'btcusdt', '1m') as stream:
+            window = CandleWindow(100, stream)
+            window.extend(await exchange.candle_history('btcusdt', '1m', datetime.now()-timedelta(minutes=100), 100, frame=True))
+            for i in range(10):
+                await stream.read()
+                close = window.close # a view, no copy
+                log.info(f'{window}, close:{close[-1]}, sma20:{close[-20:].mean():.2f}')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
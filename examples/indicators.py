@@ -0,0 +1,23 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from aiotrading import CandleStream, EMA, RSI, BollingerBands
+from aiotrading.exchange import BinanceFutures
+
+log = logging.getLogger('aiotrading')
+
+async def main():
+    async with BinanceFutures() as exchange:
+        history = await exchange.candle_history('btcusdt', '1m', datetime.now()-timedelta(minutes=500), 500, frame=True)
+        async with CandleStream(exchange, 'btcusdt', '1m') as stream:
+            indicators = [EMA(50), RSI(14), BollingerBands(20, 2)]
+            for indicator in indicators:
+                indicator.extend(history) # vectorized warm-up
+                stream.tap(indicator) # then O(1) per kline update
+            for i in range(10):
+                candle = await stream.read()
+                log.info(f'{candle.close} {indicators}')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
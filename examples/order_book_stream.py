@@ -0,0 +1,18 @@
+import asyncio
+import logging
+from aiotrading import OrderBookStream
+from aiotrading.exchange import BinanceFutures
+
+log = logging.getLogger('aiotrading')
+
+async def main():
+    async with BinanceFutures() as exchange:
+        async with OrderBookStream(exchange, 'btcusdt') as stream:
+            for i in range(10):
+                book = await stream.read() # the latest state, older ones are conflated
+                bids, asks = book.top(5)
+                log.info(f'{book}, spread:{book.spread:.2f}, bids:{bids}, asks:{asks}')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,28 @@
+import asyncio
+import logging
+from decimal import Decimal
+from aiotrading import Order
+from aiotrading.exchange import BinanceFutures
+
+API_KEY = 'YOUR_API_KEY'
+API_SECRET = 'YOUR_API_SECRET'
+SYMBOL = 'zecusdt'
+SIZE = Decimal('0.02')
+PRICE = Decimal('20')
+STEP = Decimal('0.1')
+
+log = logging.getLogger('aiotrading')
+
+async def main():
+    async with BinanceFutures(API_KEY, API_SECRET) as exchange:
+        grid = [Order(symbol=SYMBOL, size=SIZE, type='limit', side='buy', price=PRICE-i*STEP) for i in range(10)]
+        results = await exchange.submit_orders(grid) # two batches of 5, sent concurrently
+        for order, error in zip(grid, results):
+            log.info(f'{order}: {error or "submitted"}')
+        await asyncio.sleep(10)
+        await exchange.cancel_orders([o for o, e in zip(grid, results) if e is None])
+        await exchange.cancel_all_orders(SYMBOL)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s: %(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,21 @@
+import asyncio
+import logging
+from decimal import Decimal
+from aiotrading import Order
+from aiotrading.exchange import BinanceFutures
+
+log = logging.getLogger('aiotrading')
+
+async def main():
+    async with BinanceFutures() as exchange:
+        info = exchange.symbols['btcusdt']
+        log.info(f'{info}, min notional units:{info.min_notional}')
+        order = Order(symbol='btcusdt', type='limit', side='buy', size=Decimal('0.0123456'), price=Decimal('20000.123'))
+        log.info(f'before: {info.validate(order)}')
+        order.price = info.quantize_price(order.price)
+        order.size = info.quantize_size(order.size)
+        log.info(f'after: {info.validate(order) or "valid"}, price:{order.price}, size:{order.size}')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
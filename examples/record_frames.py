@@ -0,0 +1,18 @@
+import asyncio
+import logging
+from aiotrading import CandleStream, TradeStream
+from aiotrading.exchange import BinanceFutures, FrameRecorder
+
+log = logging.getLogger('aiotrading')
+
+async def main():
+    recorder = FrameRecorder('frames', max_age=600)
+    async with BinanceFutures(recorder=recorder) as exchange:
+        async with CandleStream(exchange, 'btcusdt', '1m') as candles, TradeStream(exchange, 'btcusdt') as trades:
+            for i in range(1000):
+                await trades.read()
+            log.info(recorder)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
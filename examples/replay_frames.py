@@ -0,0 +1,32 @@
+import asyncio
+import logging
+import time
+from aiotrading import CandleStream, TradeStream
+from aiotrading.exchange import BinanceFutures, FrameReplay
+
+log = logging.getLogger('aiotrading')
+
+async def consume(stream, counts):
+    while True:
+        item = await stream.read()
+        counts[stream] = counts.get(stream, 0)+1
+
+async def main():
+    # streams open as usual, but nothing connects until the replay feeds them
+    async with BinanceFutures(offline=True) as exchange:
+        async with CandleStream(exchange, 'btcusdt', '1m') as candles, TradeStream(exchange, 'btcusdt') as trades:
+            counts = {}
+            tasks = [asyncio.create_task(consume(s, counts)) for s in (candles, trades)]
+            t0 = time.perf_counter()
+            n = await exchange.replay(FrameReplay('frames', speed=None))
+            t = time.perf_counter()-t0
+            await asyncio.sleep(0)
+            for task in tasks:
+                task.cancel()
+            log.info(f'replayed {n} frames in {t:.2f} s, {n/t:.0f} frames/s')
+            for stream, count in counts.items():
+                log.info(f'{stream}: {count} items')
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.get_event_loop().run_until_complete(main())
@@ -31,4 +31,5 @@ setuptools.setup(
     keywords="trading asyncio binance restful websockets",
     python_requires='>=3.6',
     install_requires=requirements,
+    extras_require={'numpy': ['numpy'], 'orjson': ['orjson']},
 )
\ No newline at end of file
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+import websockets
+from urllib.parse import urlsplit, parse_qs
+from aiohttp import web
+from aiotrading.exchange import BinanceFutures
+
+# local stand-ins for the exchange, so tests run without network
+
+class MockRest: # answers /fapi/v{n}/<endpoint> from handlers registered per (method, endpoint)
+
+    def __init__(self):
+        self.handlers = {}
+        self.requests = [] # (method, endpoint, params) in arrival order
+        self.runner = None
+        self.uri = None
+
+    def route(self, method, endpoint, handler):
+        # handler(params) returns (status, json, headers) or just the json
+        self.handlers[(method, endpoint)] = handler
+
+    async def handle(self, request):
+        endpoint = request.match_info['endpoint']
+        params = dict(request.query)
+        self.requests.append((request.method, endpoint, params))
+        handler = self.handlers.get((request.method, endpoint))
+        if handler is None:
+            return web.json_response({'code': -1000, 'msg': f'no mock for {endpoint}'}, status=404)
+        r = handler(params)
+        if asyncio.iscoroutine(r):
+            r = await r
+        status, j, headers = r if type(r) is tuple else (200, r, {})
+        return web.Response(status=status, text=json.dumps(j), content_type='application/json', headers=headers)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route('*', '/fapi/{version}/{endpoint}', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.uri = f'http://127.0.0.1:{port}/fapi/v1/'
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+class MockWebsocket: # combined market streams at /stream?streams=a/b, user streams at /ws/<listen key>
+
+    def __init__(self):
+        self.connections = {} # websocket -> set of endpoints, the listen key for user streams
+        self.connects = 0
+        self.rejected = set() # endpoints whose subscription is answered with an error
+        self.server = None
+        self.uri = None
+
+    async def handle(self, ws):
+        url = urlsplit(ws.request.path)
+        if url.path.startswith('/ws/'):
+            endpoints = {url.path[4:]}
+        else:
+            endpoints = set(parse_qs(url.query).get('streams', [''])[0].split('/'))-{''}
+        self.connections[ws] = endpoints
+        self.connects += 1
+        try:
+            async for msg in ws:
+                j = json.loads(msg)
+                if j['method'] == 'SUBSCRIBE' and self.rejected.intersection(j['params']):
+                    await ws.send(json.dumps({'error': {'code': 2, 'msg': 'Invalid request'}, 'id': j['id']}))
+                    continue
+                if j['method'] == 'SUBSCRIBE':
+                    endpoints.update(j['params'])
+                elif j['method'] == 'UNSUBSCRIBE':
+                    endpoints.difference_update(j['params'])
+                await ws.send(json.dumps({'result': None, 'id': j['id']}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.connections.pop(ws, None)
+
+    async def send(self, endpoint, data):
+        # to every connection subscribed to endpoint; user streams get data unwrapped
+        for ws, endpoints in list(self.connections.items()):
+            if endpoint in endpoints:
+                msg = data if ws.request.path.startswith('/ws/') else {'stream': endpoint, 'data': data}
+                try:
+                    await ws.send(json.dumps(msg))
+                except websockets.ConnectionClosed:
+                    pass
+
+    async def drop(self):
+        # close every connection the way the exchange does on its daily disconnect
+        await asyncio.gather(*[ws.close(1001) for ws in list(self.connections)])
+
+    async def start(self):
+        self.server = await websockets.serve(self.handle, '127.0.0.1', 0)
+        port = next(iter(self.server.sockets)).getsockname()[1]
+        self.uri = f'ws://127.0.0.1:{port}/'
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+async def connect(**kwargs):
+    # an exchange wired to fresh mock servers, not opened: no exchangeInfo, so no rate limits
+    rest, ws = MockRest(), MockWebsocket()
+    await rest.start()
+    await ws.start()
+    exchange = BinanceFutures(api_key='key', api_secret='secret', ws_reconnect_delay=0.05, **kwargs)
+    exchange.rest_uri = rest.uri
+    exchange.ws_uri = ws.uri
+    return exchange, rest, ws
+
+async def disconnect(exchange, rest, ws):
+    await exchange.close()
+    await ws.stop()
+    await rest.stop()
+
+async def wait_for(condition, timeout=5):
+    t0 = time.monotonic()
+    while not condition():
+        assert time.monotonic()-t0 < timeout
+        await asyncio.sleep(0.01)
+
+class MockWebsocketApi: # request/response websocket api; handler(method, params) returns the result, may be a coroutine
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        self.server = None
+        self.uri = None
+
+    async def respond(self, ws, j):
+        r = self.handler(j['method'], j['params'])
+        if asyncio.iscoroutine(r):
+            r = await r
+        try:
+            await ws.send(json.dumps({'id': j['id'], 'status': 200, 'result': r}))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def handle(self, ws):
+        tasks = []
+        try:
+            async for msg in ws:
+                j = json.loads(msg)
+                self.requests.append(j)
+                tasks.append(asyncio.ensure_future(self.respond(ws, j))) # answered in whatever order they finish
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def start(self):
+        self.server = await websockets.serve(self.handle, '127.0.0.1', 0)
+        port = next(iter(self.server.sockets)).getsockname()[1]
+        self.uri = f'ws://127.0.0.1:{port}/ws-fapi/v1'
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
@@ -0,0 +1,30 @@
+import asyncio
+from aiotrading import Order
+from servers import connect, disconnect, wait_for
+
+def test_sync_keeps_orders_still_being_submitted():
+    async def main():
+        exchange, rest, ws = await connect()
+        release = asyncio.Event()
+        async def place(params):
+            await release.wait()
+            return {'orderId': 1, 'clientOrderId': params['newClientOrderId']}
+        rest.route('POST', 'order', place)
+        rest.route('GET', 'account', lambda p: {'assets': [], 'positions': []})
+        rest.route('GET', 'openOrders', lambda p: []) # served before the exchange processed the post
+        done, sending = Order('btcusdt', 'limit', 'buy', 1, 100), Order('btcusdt', 'limit', 'buy', 2, 100)
+        try:
+            release.set()
+            await exchange.submit_order(done)
+            release.clear()
+            task = asyncio.ensure_future(exchange.submit_order(sending))
+            await wait_for(lambda: len([r for r in rest.requests if r[1] == 'order']) == 2)
+            await exchange.sync_account()
+            assert done.id not in exchange.orders # final while nobody was listening
+            assert exchange.orders[sending.id] is sending
+            release.set()
+            await task
+            assert len(exchange.orders_sending) == 0
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+from aiotrading import Candle, CandleAggregator, CandleStream
+
+class Source(CandleStream): # a base candle stream fed by the test, no exchange
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+def base_candle(i):
+    t = datetime(2024, 1, 1)+timedelta(minutes=i)
+    return Candle(symbol='btcusdt', timeframe='1m', open_time=t, update_time=t+timedelta(seconds=59.999),
+        open=Decimal(i), high=Decimal(i+1), low=Decimal(i), close=Decimal(i), volume=Decimal(1),
+        buy_volume=Decimal(0), trades=1, closed=True)
+
+def test_blocking_output_waits_for_reader():
+    async def main():
+        source = Source(None, 'btcusdt', '1m')
+        async with CandleAggregator(source, ['5m'], maxsize=2) as aggregator:
+            for i in range(12):
+                await source.write(base_candle(i))
+            stream = aggregator.streams['5m']
+            candles = [await asyncio.wait_for(stream.read(), 1) for i in range(12)]
+            assert stream.drops == 0
+            assert [c.open_time.minute for c in candles if c.closed] == [0, 5]
+            assert candles[-1].open_time.minute == 10 and candles[-1].close == 11
+    asyncio.run(main())
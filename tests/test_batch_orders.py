@@ -0,0 +1,65 @@
+import asyncio
+import json
+from aiotrading import Order
+from servers import connect, disconnect
+
+def test_submit_orders_maps_results_in_input_order():
+    async def main():
+        exchange, rest, ws = await connect()
+        chunks = []
+        inflight = [0, 0] # current, max
+        async def batch(params):
+            entries = json.loads(params['batchOrders'])
+            chunks.append(len(entries))
+            inflight[0] += 1
+            inflight[1] = max(inflight)
+            await asyncio.sleep(0.05)
+            inflight[0] -= 1
+            if any(e['quantity'] == '99' for e in entries):
+                return 400, {'code': -1102, 'msg': 'bad chunk'}, {}
+            return [{'code': -2019, 'msg': 'Margin is insufficient.'} if e['quantity'] == '7' else
+                {'orderId': i, 'clientOrderId': e['newClientOrderId']} for i, e in enumerate(entries)]
+        rest.route('POST', 'batchOrders', batch)
+        sizes = [1, 2, 7, 1, 1, 1, 7, 1, 1, 1, 1, 1]
+        orders = [Order('btcusdt', 'limit', 'buy', size, 100) for size in sizes]
+        try:
+            results = await exchange.submit_orders(orders)
+            assert sorted(chunks) == [2, 5, 5]
+            assert inflight[1] == 3 # chunks run concurrently
+            assert [r is not None for r in results] == [s == 7 for s in sizes]
+            assert all('-2019' in str(r) for r in results if r is not None)
+            assert set(exchange.orders) == {o.id for o, s in zip(orders, sizes) if s != 7}
+            results = await exchange.submit_orders(Order('btcusdt', 'limit', 'buy', size, 100) for size in [1, 7])
+            assert [r is not None for r in results] == [False, True] # a generator is read once
+            orders = [Order('btcusdt', 'limit', 'buy', size, 100) for size in [1, 99, 1, 1, 1, 1]]
+            results = await exchange.submit_orders(orders)
+            assert [r is not None for r in results] == [True]*5+[False] # the failed request fails its chunk
+            assert 'bad chunk' in str(results[0])
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
+
+def test_cancel_orders_chunks_per_symbol():
+    async def main():
+        exchange, rest, ws = await connect()
+        chunks = []
+        def cancel(params):
+            ids = json.loads(params['origClientOrderIdList'])
+            chunks.append((params['symbol'], len(ids)))
+            return [{'code': -2011, 'msg': 'Unknown order sent.'} if id.startswith('gone') else
+                {'orderId': 1, 'clientOrderId': id} for id in ids]
+        rest.route('DELETE', 'batchOrders', cancel)
+        rest.route('DELETE', 'allOpenOrders', lambda p: {'code': 200, 'msg': 'done'})
+        orders = []
+        for i in range(23):
+            symbol = 'ethusdt' if i%3 == 0 else 'btcusdt'
+            orders.append(Order(symbol, 'limit', 'buy', 1, 100, id=f'gone{i}' if i in (4, 9) else f'order{i}'))
+        try:
+            results = await exchange.cancel_orders(orders)
+            assert sorted(chunks) == [('BTCUSDT', 5), ('BTCUSDT', 10), ('ETHUSDT', 8)]
+            assert [r is not None for r in results] == [i in (4, 9) for i in range(23)]
+            await exchange.cancel_all_orders('btcusdt')
+            assert rest.requests[-1][:2] == ('DELETE', 'allOpenOrders') and rest.requests[-1][2]['symbol'] == 'BTCUSDT'
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
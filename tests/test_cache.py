@@ -0,0 +1,46 @@
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+from aiotrading import Candle, HistoryCache
+
+t0 = datetime(2024, 1, 1)
+
+def make_fetch(calls):
+    # klines semantics: the bars opening at or after start_time
+    async def fetch(start_time, count):
+        calls.append((start_time, count))
+        first = t0+timedelta(minutes=-(-(start_time-t0)//timedelta(minutes=1)))
+        return [Candle(symbol='btcusdt', timeframe='1m', open_time=first+timedelta(minutes=i),
+            update_time=first+timedelta(minutes=i+1, milliseconds=-1), open=Decimal(1), high=Decimal(2), low=Decimal(1),
+            close=Decimal(i), volume=Decimal(1), buy_volume=Decimal(0), trades=1, closed=True) for i in range(count)]
+    return fetch
+
+def test_unaligned_span_does_not_break_aligned_request():
+    async def main():
+        cache = HistoryCache(':memory:')
+        cache.open()
+        calls = []
+        fetch = make_fetch(calls)
+        a = await cache.candle_history(fetch, 'btcusdt', '1m', t0+timedelta(seconds=30), 10)
+        assert [c.open_time for c in a] == [t0+timedelta(minutes=i+1) for i in range(10)]
+        b = await cache.candle_history(fetch, 'btcusdt', '1m', t0, 10)
+        assert [c.open_time for c in b] == [t0+timedelta(minutes=i) for i in range(10)]
+        assert calls[1] == (t0, 1) # only the bar before the cached span
+        c = await cache.candle_history(fetch, 'btcusdt', '1m', t0, 11)
+        assert len(calls) == 2 and [x.open_time for x in c] == [t0+timedelta(minutes=i) for i in range(11)]
+        cache.close()
+    asyncio.run(main())
+
+def test_span_stored_unaligned_by_older_versions():
+    async def main():
+        cache = HistoryCache(':memory:')
+        cache.open()
+        calls = []
+        fetch = make_fetch(calls)
+        await cache.candle_history(fetch, 'btcusdt', '1m', t0+timedelta(minutes=1), 10)
+        start = int((t0+timedelta(seconds=30)).timestamp()*1000)
+        cache.db.execute('update spans set start=?', (start,))
+        b = await cache.candle_history(fetch, 'btcusdt', '1m', t0, 10)
+        assert [c.open_time for c in b] == [t0+timedelta(minutes=i) for i in range(10)]
+        cache.close()
+    asyncio.run(main())
@@ -0,0 +1,28 @@
+import time
+from datetime import datetime
+from decimal import Decimal
+from aiotrading import Candle, CandleFrame, SMA
+from aiotrading.exchange import BinanceFutures
+
+def kline_rows(closes):
+    # rest klines up to now, the last one still open
+    now = int(time.time()*1000)//60000*60000
+    t0 = now-(len(closes)-1)*60000
+    return [[t0+i*60000, '1', '2', '0.5', str(c), '10', t0+i*60000+59999, '20', 5, '4', '8', '0'] for i, c in enumerate(closes)]
+
+def final_update(row, close):
+    return Candle(symbol='btcusdt', timeframe='1m', open_time=datetime.fromtimestamp(row[0]/1000),
+        update_time=datetime.fromtimestamp(row[6]/1000), open=Decimal(1), high=Decimal(2), low=Decimal('0.5'),
+        close=Decimal(close), volume=Decimal(10), buy_volume=Decimal(4), trades=5, closed=True)
+
+def test_warm_up_leaves_open_bar_provisional():
+    rows = kline_rows([10, 20, 30])
+    exchange = BinanceFutures()
+    candles = [exchange.rest_parse_candle('btcusdt', '1m', d) for d in rows]
+    frame = CandleFrame.from_klines('btcusdt', '1m', rows)
+    assert [c.closed for c in candles] == [True, True, False]
+    assert frame.closed.tolist() == [True, True, False]
+    for history in (frame, candles):
+        sma = SMA(2)
+        assert sma.extend(history) == 25.0
+        assert sma.update(final_update(rows[-1], 40)) == 30.0
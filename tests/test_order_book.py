@@ -0,0 +1,86 @@
+import asyncio
+import time
+from aiotrading import OrderBookStream
+from servers import connect, disconnect, wait_for
+
+endpoint = 'btcusdt@depth@100ms'
+
+def diff(first, last, prev, bids=(), asks=()):
+    t = int(time.time()*1000)
+    return {'e': 'depthUpdate', 'E': t, 'T': t, 's': 'BTCUSDT', 'U': first, 'u': last, 'pu': prev,
+        'b': [list(l) for l in bids], 'a': [list(l) for l in asks]}
+
+def snapshot(id, bids=(('99', '1'),), asks=(('101', '1'),)):
+    return {'lastUpdateId': id, 'bids': [list(l) for l in bids], 'asks': [list(l) for l in asks]}
+
+async def setup():
+    exchange, rest, ws = await connect()
+    snapshots = asyncio.Queue() # the depth endpoint answers once the test provides a snapshot
+    async def depth(params):
+        return await snapshots.get()
+    rest.route('GET', 'depth', depth)
+    return exchange, rest, ws, snapshots
+
+def depth_requests(rest):
+    return len([r for r in rest.requests if r[1] == 'depth'])
+
+def test_buffered_diffs_join_snapshot():
+    async def main():
+        exchange, rest, ws, snapshots = await setup()
+        try:
+            async with OrderBookStream(exchange, 'btcusdt') as stream:
+                await ws.send(endpoint, diff(90, 95, 89, bids=[('97', '7')])) # older than the snapshot
+                await ws.send(endpoint, diff(96, 102, 95, bids=[('99', '2')]))
+                await ws.send(endpoint, diff(103, 105, 102, asks=[('101', '0'), ('102', '3')]))
+                await wait_for(lambda: len(exchange.mws_book_buffers.get(endpoint, ())) == 3)
+                await snapshots.put(snapshot(100))
+                book = await asyncio.wait_for(stream.read(), 5)
+                assert book.synced and book.update_id == 105
+                assert book.bids.size_at(97) == 0 and book.bids.size_at(99) == 2
+                assert book.best_ask == (102.0, 3.0)
+                await ws.send(endpoint, diff(106, 106, 105, bids=[('100', '1')]))
+                await wait_for(lambda: book.update_id == 106)
+                assert book.best_bid == (100.0, 1.0)
+                assert depth_requests(rest) == 1
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
+
+def test_gap_reloads_book():
+    async def main():
+        exchange, rest, ws, snapshots = await setup()
+        try:
+            async with OrderBookStream(exchange, 'btcusdt'):
+                await snapshots.put(snapshot(100))
+                await wait_for(lambda: exchange.mws_books[endpoint].synced)
+                book = exchange.mws_books[endpoint]
+                await ws.send(endpoint, diff(99, 101, 98))
+                await wait_for(lambda: book.update_id == 101)
+                await ws.send(endpoint, diff(150, 160, 140)) # 102..149 were lost
+                await wait_for(lambda: not book.synced and depth_requests(rest) == 2)
+                await ws.send(endpoint, diff(161, 205, 160, bids=[('98', '4')]))
+                await snapshots.put(snapshot(200))
+                await wait_for(lambda: book.synced and book.update_id == 205)
+                assert book.bids.size_at(98) == 4
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
+
+def test_snapshot_behind_buffer_is_retried():
+    async def main():
+        exchange, rest, ws, snapshots = await setup()
+        try:
+            async with OrderBookStream(exchange, 'btcusdt'):
+                await ws.send(endpoint, diff(120, 125, 119))
+                await ws.send(endpoint, diff(126, 135, 125, asks=[('103', '2')]))
+                await wait_for(lambda: len(exchange.mws_book_buffers.get(endpoint, ())) == 2)
+                await snapshots.put(snapshot(100)) # does not reach the first buffered diff
+                await wait_for(lambda: depth_requests(rest) == 2)
+                book = exchange.mws_books[endpoint]
+                assert not book.synced
+                await snapshots.put(snapshot(130))
+                await wait_for(lambda: book.synced)
+                assert book.update_id == 135 and book.asks.size_at(103) == 2
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
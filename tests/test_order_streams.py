@@ -0,0 +1,34 @@
+import asyncio
+import time
+from aiotrading import Order, OrderUpdateStream
+from servers import connect, disconnect, wait_for
+
+def order_update(id, status='NEW'):
+    return {'e': 'ORDER_TRADE_UPDATE', 'T': int(time.time()*1000), 'o': {'c': id, 's': 'BTCUSDT', 'o': 'LIMIT',
+        'S': 'BUY', 'q': '1', 'p': '100', 'sp': '0', 'R': False, 'f': 'GTC', 'X': status, 'l': '0', 'z': '0', 'L': '0', 'ap': '0'}}
+
+def test_stream_opened_before_submit_gets_only_its_order():
+    async def main():
+        exchange, rest, ws = await connect()
+        rest.route('POST', 'listenKey', lambda p: {'listenKey': 'key'})
+        rest.route('DELETE', 'listenKey', lambda p: {})
+        rest.route('POST', 'order', lambda p: {})
+        order = Order('btcusdt', 'limit', 'buy', 1, 100)
+        try:
+            async with OrderUpdateStream(exchange) as every, OrderUpdateStream(exchange, order) as mine:
+                await wait_for(lambda: len(ws.connections) == 1)
+                await exchange.submit_order(order)
+                await ws.send('key', order_update('elsewhere')) # another client's order
+                await ws.send('key', order_update(order.id))
+                u = await asyncio.wait_for(mine.read(), 5)
+                assert u.order is order
+                assert [(await every.read()).order.id for i in range(2)] == ['elsewhere', order.id]
+                assert mine.queue.qsize() == 0
+                await exchange.submit_order(order) # a resubmit moves the stream to the new id
+                await ws.send('key', order_update(order.id, 'FILLED'))
+                u = await asyncio.wait_for(mine.read(), 5)
+                assert u.status == 'fill'
+            assert exchange.uws_order_streams == {} and exchange.uws_order_keys == {}
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
@@ -0,0 +1,48 @@
+import asyncio
+from aiotrading import Order
+from servers import MockWebsocketApi, connect, disconnect
+
+orders_header = 'X-MBX-ORDER-COUNT-1M'
+
+def test_websocket_api_responses_match_requests():
+    async def main():
+        exchange, rest, ws = await connect(order_transport='ws')
+        async def place(method, params):
+            await asyncio.sleep(0.2-float(params['quantity'])/50) # later requests are answered first
+            return {'clientOrderId': params['newClientOrderId'], 'origQty': params['quantity']}
+        api = MockWebsocketApi(place)
+        await api.start()
+        exchange.wsa_uri = api.uri
+        try:
+            params = [{'symbol': 'BTCUSDT', 'side': 'BUY', 'type': 'LIMIT', 'quantity': str(i), 'price': '100',
+                'timeInForce': 'GTC', 'newClientOrderId': f'order{i}'} for i in range(1, 6)]
+            results = await asyncio.gather(*[exchange.order_request('order', p, 'POST') for p in params])
+            assert [r['clientOrderId'] for r in results] == [f'order{i}' for i in range(1, 6)]
+            assert [r['origQty'] for r in results] == [str(i) for i in range(1, 6)]
+            assert all(r['method'] == 'order.place' and 'signature' in r['params'] for r in api.requests)
+            assert len(rest.requests) == 0
+        finally:
+            await disconnect(exchange, rest, ws)
+            await api.stop()
+    asyncio.run(main())
+
+def test_fallback_to_rest_charges_once():
+    async def main():
+        exchange, rest, ws = await connect(order_transport='ws')
+        api = MockWebsocketApi(lambda method, params: {})
+        await api.start()
+        exchange.wsa_uri = api.uri
+        await api.stop() # nothing listens there any more
+        rest.route('POST', 'order', lambda p: {'clientOrderId': p['newClientOrderId']})
+        exchange.rest_limiter.add(orders_header, 'orders', 100, 60)
+        try:
+            order = Order('btcusdt', 'limit', 'buy', 1, 100)
+            await exchange.submit_order(order)
+            assert [(m, e) for m, e, p in rest.requests] == [('POST', 'order')]
+            assert rest.requests[0][2]['newClientOrderId'] == order.id
+            bucket = exchange.rest_limiter.buckets[orders_header]
+            bucket.refill()
+            assert 98.5 < bucket.tokens < 99.5 # one order counted, not two
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+import asyncio
+import time
+from aiotrading.exchange import BinanceFutures
+from aiotrading.exchange.rate_limiter import RateLimiter
+from servers import MockRest
+
+header = 'X-MBX-USED-WEIGHT-1M'
+
+class Ticker: # measures the longest stall of the event loop while it runs
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.max_gap = 0
+        self.task = None
+
+    async def run(self):
+        t = time.monotonic()
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.max_gap = max(self.max_gap, now-t-self.interval)
+            t = now
+
+    def __enter__(self):
+        self.task = asyncio.get_event_loop().create_task(self.run())
+        return self
+
+    def __exit__(self, *args):
+        self.task.cancel()
+
+def test_header_feedback_drains_bucket():
+    async def main():
+        limiter = RateLimiter()
+        limiter.add(header, 'weight', 100, 1)
+        limiter.update({header: '95'})
+        assert limiter.buckets[header].tokens <= 5+1
+        t0 = time.monotonic()
+        await limiter.acquire(10)
+        assert time.monotonic()-t0 >= 0.03 # the server said the budget is nearly spent
+        limiter.update({'X-MBX-USED-WEIGHT-1S': '1'}) # headers of other limits are ignored
+    asyncio.run(main())
+
+def test_concurrent_callers_do_not_block_loop():
+    async def main():
+        limiter = RateLimiter()
+        limiter.add(header, 'weight', 20, 0.5)
+        done = []
+        async def call(i):
+            await limiter.acquire(1)
+            done.append(i)
+        with Ticker() as ticker:
+            t0 = time.monotonic()
+            await asyncio.gather(*[call(i) for i in range(50)])
+            t = time.monotonic()-t0
+        assert done == list(range(50)) # served in arrival order
+        assert t >= 0.6 # 30 calls over the burst at 40 per second
+        assert ticker.max_gap < 0.05
+    asyncio.run(main())
+
+def test_request_syncs_from_response_headers():
+    async def main():
+        server = MockRest()
+        def ping(params):
+            return 200, {}, {header: '1200'} # the whole minute budget is spent
+        server.route('GET', 'ping', ping)
+        await server.start()
+        exchange = BinanceFutures()
+        exchange.rest_uri = server.uri
+        exchange.rest_limits[header] = (1200, 60)
+        exchange.rest_limiter.add(header, 'weight', 1200, 60)
+        try:
+            with Ticker() as ticker:
+                await exchange.request('ping')
+                t0 = time.monotonic()
+                await asyncio.gather(*[exchange.request('ping') for i in range(3)])
+                assert time.monotonic()-t0 >= 0.1 # refilled at 20 per second
+            assert ticker.max_gap < 0.05
+        finally:
+            await exchange.close()
+            await server.stop()
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from aiotrading import CandleStream, TradeStream, OrderUpdateStream
+from servers import connect, disconnect, wait_for
+
+def agg_trade(symbol, id):
+    t = int(time.time()*1000)
+    return {'e': 'aggTrade', 'E': t, 'a': id, 's': symbol.upper(), 'p': '100.5', 'q': '2', 'f': id, 'l': id, 'T': t, 'm': False}
+
+def kline(open_time, closed):
+    return {'t': open_time, 'T': open_time+59999, 's': 'BTCUSDT', 'i': '1m', 'f': 1, 'L': 2, 'o': '1', 'c': '2',
+        'h': '3', 'l': '0.5', 'v': '10', 'n': 5, 'x': closed, 'q': '20', 'V': '4', 'Q': '8', 'B': '0'}
+
+def kline_row(k):
+    return [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'], k['T'], k['q'], k['n'], k['V'], k['Q'], k['B']]
+
+def test_trades_are_gapless_across_drops():
+    async def main():
+        exchange, rest, ws = await connect(ws_max_streams=1) # a shard per symbol
+        symbols = ['aaausdt', 'bbbusdt', 'cccusdt']
+        history = {s: [] for s in symbols}
+        last_id = 400
+        rest.route('GET', 'aggTrades', lambda p: [d for d in history[p['symbol'].lower()] if d['a'] >= int(p['fromId'])][:int(p['limit'])])
+        async def produce():
+            for id in range(1, last_id+1):
+                for s in symbols:
+                    d = agg_trade(s, id)
+                    history[s].append(d)
+                    await ws.send(f'{s}@aggTrade', d)
+                if id in (100, 250):
+                    await ws.drop() # trades keep coming while nobody is connected
+                await asyncio.sleep(0.002)
+        async def consume(stream):
+            ids = []
+            while len(ids) == 0 or ids[-1] < last_id:
+                ids.append((await stream.read()).id)
+            return ids
+        try:
+            streams = [TradeStream(exchange, s) for s in symbols]
+            for stream in streams:
+                await stream.open()
+            assert len(exchange.mws_shards) == 3
+            producer = asyncio.ensure_future(produce())
+            results = await asyncio.wait_for(asyncio.gather(*[consume(s) for s in streams]), 10)
+            await producer
+            for ids in results:
+                assert ids == list(range(ids[0], last_id+1))
+            assert ws.connects == 9
+            assert any(m == 'GET' and e == 'aggTrades' for m, e, p in rest.requests)
+            for stream in streams:
+                await stream.close()
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
+
+def test_closed_candle_is_not_delivered_again():
+    async def main():
+        exchange, rest, ws = await connect()
+        t0 = int(time.time()*1000)//60000*60000-60000
+        bars = [kline(t0, True), kline(t0+60000, False)]
+        rest.route('GET', 'klines', lambda p: [kline_row(k) for k in bars if k['t'] >= int(p['startTime'])][:int(p['limit'])])
+        try:
+            async with CandleStream(exchange, 'btcusdt', '1m') as stream:
+                await ws.send('btcusdt@kline_1m', {'e': 'kline', 'E': t0+60000, 's': 'BTCUSDT', 'k': bars[0]})
+                c = await asyncio.wait_for(stream.read(), 5)
+                assert c.closed and int(c.open_time.timestamp()*1000) == t0
+                await ws.drop()
+                c = await asyncio.wait_for(stream.read(), 5) # from backfill
+                assert int(c.open_time.timestamp()*1000) == t0+60000 and not c.closed
+                starts = [int(p['startTime']) for m, e, p in rest.requests if e == 'klines']
+                assert starts == [t0+60000]
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
+
+def test_user_stream_reconnects_with_new_listen_key():
+    async def main():
+        exchange, rest, ws = await connect()
+        keys = []
+        def create_key(params):
+            keys.append(f'key{len(keys)+1}')
+            return {'listenKey': keys[-1]}
+        rest.route('POST', 'listenKey', create_key)
+        rest.route('DELETE', 'listenKey', lambda p: {})
+        update = {'e': 'ORDER_TRADE_UPDATE', 'T': int(time.time()*1000), 'o': {'c': 'abc', 's': 'BTCUSDT', 'o': 'LIMIT',
+            'S': 'BUY', 'q': '1', 'p': '100', 'sp': '0', 'R': False, 'f': 'GTC', 'X': 'NEW', 'l': '0', 'z': '0', 'L': '0', 'ap': '0'}}
+        try:
+            async with OrderUpdateStream(exchange) as stream:
+                await wait_for(lambda: len(ws.connections) == 1)
+                await ws.drop()
+                await wait_for(lambda: len(keys) == 2 and len(ws.connections) == 1)
+                await ws.send('key2', update)
+                u = await asyncio.wait_for(stream.read(), 5)
+                assert u.order.id == 'abc' and u.status == 'submit'
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
+
+def test_raising_tap_does_not_silence_shard():
+    class Broken:
+        def update(self, d):
+            raise ValueError('broken tap')
+    async def main():
+        exchange, rest, ws = await connect()
+        rest.route('GET', 'aggTrades', lambda p: [])
+        try:
+            bad, good = TradeStream(exchange, 'aaausdt'), TradeStream(exchange, 'bbbusdt')
+            await bad.open()
+            await good.open()
+            assert len(exchange.mws_shards) == 1
+            bad.tap(Broken())
+            await ws.send('aaausdt@aggTrade', agg_trade('aaausdt', 1))
+            await ws.send('bbbusdt@aggTrade', agg_trade('bbbusdt', 1))
+            assert (await asyncio.wait_for(good.read(), 5)).id == 1
+            await ws.drop()
+            await wait_for(lambda: ws.connects == 2 and len(ws.connections) == 1)
+            await ws.send('bbbusdt@aggTrade', agg_trade('bbbusdt', 2))
+            assert (await asyncio.wait_for(good.read(), 5)).id == 2
+            await bad.close()
+            await good.close()
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
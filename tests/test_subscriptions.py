@@ -0,0 +1,51 @@
+import asyncio
+from aiotrading import TradeStream
+from servers import connect, disconnect, wait_for
+from test_reconnect import agg_trade
+
+def test_failed_subscribe_rolls_back():
+    async def main():
+        exchange, rest, ws = await connect()
+        try:
+            async with TradeStream(exchange, 'btcusdt'):
+                stream = TradeStream(exchange, 'ethusdt')
+                ws.rejected.add('ethusdt@aggTrade')
+                for i in range(2):
+                    try:
+                        await stream.open()
+                        assert False
+                    except Exception as e:
+                        assert 'Invalid request' in str(e)
+                    assert 'ethusdt@aggTrade' not in exchange.mws_streams
+                    assert 'ethusdt@aggTrade' not in exchange.mws_connected
+                    assert 'ethusdt@aggTrade' not in exchange.mws_endpoint_shard
+                    assert exchange.mws_shards[0].endpoints == {'btcusdt@aggTrade'}
+                ws.rejected.clear()
+                await stream.open() # a retry registers the stream once
+                assert exchange.mws_streams['ethusdt@aggTrade'] == (stream,)
+                await ws.send('ethusdt@aggTrade', agg_trade('ethusdt', 1))
+                assert (await asyncio.wait_for(stream.read(), 5)).id == 1
+                await asyncio.sleep(0.1)
+                assert stream.queue.qsize() == 0
+                await stream.close()
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
+
+def test_open_while_shard_reconnects():
+    async def main():
+        exchange, rest, ws = await connect()
+        exchange.ws_reconnect_delay = 0.5
+        rest.route('GET', 'aggTrades', lambda p: [])
+        try:
+            async with TradeStream(exchange, 'btcusdt'):
+                await ws.drop()
+                await wait_for(lambda: exchange.mws_shards[0].reconnecting)
+                async with TradeStream(exchange, 'ethusdt') as stream: # no subscribe on the dead socket
+                    await wait_for(lambda: ws.connects == 2 and len(ws.connections) == 1)
+                    assert 'ethusdt@aggTrade' in next(iter(ws.connections.values()))
+                    await ws.send('ethusdt@aggTrade', agg_trade('ethusdt', 1))
+                    assert (await asyncio.wait_for(stream.read(), 5)).id == 1
+        finally:
+            await disconnect(exchange, rest, ws)
+    asyncio.run(main())
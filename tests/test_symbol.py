@@ -0,0 +1,20 @@
+from aiotrading import Order, SymbolInfo
+from aiotrading.exchange import BinanceFutures
+
+def btcusdt():
+    return SymbolInfo('btcusdt', tick_size='0.10', step_size='0.001', min_price='556.80', max_price='4529764',
+        min_size='0.001', max_size='1000', market_step_size='0.001', market_min_size='0.001', market_max_size='120',
+        min_notional='5', band_up='1.0500', band_down='0.9500')
+
+def test_symbol_case_does_not_matter():
+    exchange = BinanceFutures()
+    exchange.symbols = {'btcusdt': btcusdt()}
+    exchange.check_order(Order('BTCUSDT', 'limit', 'buy', '0.01', '30000.0'))
+    exchange.check_order(Order('btcusdt', 'limit', 'buy', '0.01', '30000.0'))
+
+def test_float_sizes_and_prices():
+    info = btcusdt()
+    assert info.validate(Order('btcusdt', 'limit', 'buy', 0.01, 30000.1)) is None
+    assert info.validate(Order('btcusdt', 'market', 'sell', 0.003)) is None
+    assert 'not a multiple' in info.validate(Order('btcusdt', 'limit', 'buy', 0.0105, 30000.1))
+    assert info.validate(Order('btcusdt', 'limit', 'buy', 0.01, 30000.1), mark_price=30000.3) is None